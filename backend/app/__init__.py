@@ -2,17 +2,17 @@
 """
 The script initializes the SQLAlchemy and Flask application.
 """
-from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
 from flask_cors import CORS
 from flask_migrate import Migrate
 from config import Config
 from flask_migrate import Migrate
+from .auth import CachingJWTManager
 
 # Initialize extensions
 db = SQLAlchemy()
-jwt = JWTManager()
+jwt = CachingJWTManager()  # Decodes each request's token once
 migrate = Migrate()
 
 def create_app():
@@ -26,6 +26,12 @@ def create_app():
     app.config.from_object("config.Config")
     app.secret_key = "maunyit"
 
+    # Take the client address and scheme from the trusted proxies' headers
+    if app.config["TRUSTED_PROXY_HOPS"]:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config["TRUSTED_PROXY_HOPS"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
     # Enable CORS for all routes with credentials support
     CORS(app, resources={
         r"/api/*": {
@@ -39,13 +45,43 @@ def create_app():
     # Initialize the database with the app
     db.init_app(app)
     jwt.init_app(app)
-    migrate.init_app(app, db)
+    # SQLite can't ALTER most constraints in place; use batch migrations
+    migrate.init_app(app, db, render_as_batch=app.config["SQLITE_MODE"])
+
+    # Tune SQLite connections and serialize writers for edge deployments
+    if app.config["SQLITE_MODE"]:
+        from .sqlite import init_sqlite
+        init_sqlite(app)
 
     # Import models within the function to avoid circular imports
-    from app.models import BaseModel, User, Record, Prediction, MarketData
+    from app.models import (BaseModel, User, Record, Prediction, MarketData,
+                            PriceSketch, Tombstone, AlertSubscription, DiseaseRisk,
+                            RevokedToken)
 
     # Register the main routes blueprint
     from .routes import main_routes
     app.register_blueprint(main_routes)
 
+    # JWT denylist checked through an in-memory Bloom filter
+    from .revocation import init_revocation
+    init_revocation(app)
+
+    # Per-user read cache, invalidated on commit
+    from .cache import init_read_cache
+    init_read_cache(app)
+
+    # Shed load early when the process is saturated
+    if app.config["ADMISSION_ENABLED"]:
+        from .admission import init_admission
+        init_admission(app)
+
+    # Sampling profiler, only wired in when an admin token is configured
+    if app.config["PROFILER_TOKEN"]:
+        from .profiling import init_profiler
+        init_profiler(app)
+
+    # Register maintenance CLI commands
+    from .commands import register_commands
+    register_commands(app)
+
     return app
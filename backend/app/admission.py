@@ -0,0 +1,244 @@
+#!/usr/bin/python3
+"""
+Admission control and load shedding for the Gaine Africa API.
+
+Every request is classified into a priority class by endpoint. Before a
+view runs, the controller checks, in order:
+
+- how long the request already waited in front of the app (from the
+  proxy's X-Request-Start header), shedding requests whose client has
+  likely given up;
+- how many requests this process is already serving, shedding lower
+  classes first as in-flight work approaches capacity;
+- a per-user token bucket for authenticated requests, or a per-IP one
+  for anonymous requests. The client address is the peer address, or the
+  one the proxies report when TRUSTED_PROXY_HOPS is set.
+
+A /api/batch request is charged one token per sub-request and occupies
+one in-flight slot per worker thread it may run on, since it does the
+work of that many separate requests.
+
+Shed requests get 503 (overload) or 429 (rate limit) with Retry-After,
+so the work the server does accept finishes within a bounded time.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import decode_token
+
+HIGH, NORMAL, LOW = "high", "normal", "low"
+
+# Endpoints that keep farmers' work moving win over bulk reads
+ENDPOINT_PRIORITIES = {
+    "main_routes.login": HIGH,
+    "main_routes.register": HIGH,
+    "main_routes.create_record": HIGH,
+    "main_routes.push_changes": HIGH,
+    "main_routes.get_users": LOW,
+    "main_routes.get_records": LOW,
+    "main_routes.get_predictions": LOW,
+    "main_routes.pull_changes": LOW,
+}
+
+BATCH_ENDPOINT = "main_routes.batch"
+
+# Long-lived or trivial endpoints that are never counted or shed
+EXEMPT_ENDPOINTS = {"static", "main_routes.stream_market_data"}
+
+# Share of ADMISSION_MAX_IN_FLIGHT each class may fill before being shed
+IN_FLIGHT_SHARE = {HIGH: 1.0, NORMAL: 0.8, LOW: 0.5}
+
+# Environ keys; clients cannot set these through HTTP headers
+ADMITTED_KEY = "gaine.admitted"  # In-flight slots held by the request
+SUBREQUEST_KEY = "gaine.batch_subrequest"
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+
+    def take(self, cost=1):
+        """
+        Try to spend ``cost`` tokens, capped at the burst size.
+
+        Returns:
+            float: 0 if admitted, else seconds until enough tokens are available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        cost = min(cost, self.burst)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class BucketTable:
+    """Size-bounded map of keys to token buckets, evicting least recent."""
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def take(self, key, cost=1):
+        """Spend tokens from ``key``'s bucket; see TokenBucket.take."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(cost)
+
+
+class AdmissionController:
+    """
+    Per-process admission state shared by all request threads.
+    """
+
+    def __init__(self, config):
+        self.max_in_flight = config["ADMISSION_MAX_IN_FLIGHT"]
+        self.max_queue_wait = config["ADMISSION_MAX_QUEUE_WAIT"]
+        self.retry_after = config["ADMISSION_RETRY_AFTER"]
+        self.in_flight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+        self._users = BucketTable(*config["ADMISSION_USER_RATE"])
+        self._ips = BucketTable(*config["ADMISSION_IP_RATE"])
+
+    def admit(self, priority, user_key, ip_key, queue_wait, cost=1, slots=1):
+        """
+        Decide whether a request may run.
+
+        Args:
+            cost (int): Rate-limit tokens the request spends.
+            slots (int): In-flight slots it occupies until released.
+
+        Returns:
+            tuple: (status, retry_after) where status is None if admitted,
+            else 503 or 429.
+        """
+        with self._lock:
+            limit = self.max_in_flight * IN_FLIGHT_SHARE[priority]
+            if (queue_wait is not None and queue_wait > self.max_queue_wait[priority]
+                    or self.in_flight + slots > max(limit, slots)):
+                self.shed += 1
+                return 503, self.retry_after
+
+            # Users behind one carrier NAT share an IP, so authenticated
+            # requests are only limited per user
+            if user_key is not None:
+                wait = self._users.take(user_key, cost)
+            else:
+                wait = self._ips.take(ip_key, cost)
+            if wait:
+                return 429, max(1, math.ceil(wait))
+
+            self.in_flight += slots
+        return None, 0
+
+    def release(self, slots=1):
+        """Mark an admitted request as finished."""
+        with self._lock:
+            self.in_flight -= slots
+
+
+def _queue_wait():
+    """
+    Seconds the request spent queued before reaching the app, if known.
+
+    Reads X-Request-Start as set by nginx ("t=<seconds>.<ms>") or Heroku
+    (milliseconds since the epoch).
+    """
+    header = request.headers.get("X-Request-Start")
+    if not header:
+        return None
+    try:
+        started = float(header.split("=")[-1])
+    except ValueError:
+        return None
+    if started > 1e14:  # Microseconds
+        started /= 1e6
+    elif started > 1e11:  # Milliseconds
+        started /= 1e3
+    return max(0.0, time.time() - started)
+
+
+def _user_key():
+    """Identity from a valid bearer token, or None for anonymous callers."""
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    try:
+        return decode_token(auth[7:])["sub"]
+    except Exception:  # Invalid tokens are rejected later by the view
+        return None
+
+
+def _batch_size():
+    """
+    Sub-requests in a /api/batch body, or 1 for any other request.
+
+    The view rejects oversized batches, so the count is capped there too.
+    """
+    if request.endpoint != BATCH_ENDPOINT:
+        return 1
+    data = request.get_json(silent=True)
+    items = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return 1
+    return max(1, min(len(items), current_app.config["BATCH_MAX_REQUESTS"]))
+
+
+def _overloaded(status, retry_after):
+    """Build the shed response with a Retry-After hint."""
+    message = "Too many requests" if status == 429 else "Server busy, retry later"
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def init_admission(app):
+    """Install admission control hooks on the application."""
+    controller = AdmissionController(app.config)
+    app.extensions["admission"] = controller
+
+    @app.before_request
+    def admit_request():
+        if (request.method == "OPTIONS"
+                or request.endpoint is None
+                or request.endpoint in EXEMPT_ENDPOINTS
+                or request.environ.get(SUBREQUEST_KEY)):
+            return None
+        priority = ENDPOINT_PRIORITIES.get(request.endpoint, NORMAL)
+        cost = _batch_size()
+        slots = min(cost, current_app.config["BATCH_MAX_WORKERS"])
+        status, retry_after = controller.admit(
+            priority, _user_key(), request.remote_addr, _queue_wait(),
+            cost=cost, slots=slots)
+        if status:
+            current_app.logger.warning(
+                "Shed %s %s with %s (%s in flight)",
+                request.method, request.path, status, controller.in_flight)
+            return _overloaded(status, retry_after)
+        request.environ[ADMITTED_KEY] = slots
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        slots = request.environ.pop(ADMITTED_KEY, 0)
+        if slots:
+            controller.release(slots)
@@ -0,0 +1,266 @@
+#!/usr/bin/python3
+"""
+Price alert matching and delivery.
+
+Subscriptions are indexed per (crop, market) in two sorted threshold
+lists, one per direction. When a tick moves a market's price from
+``previous`` to ``price``, the subscriptions it crossed occupy one
+contiguous slice of each list, so matching costs O(log n + k) for k
+triggered alerts instead of scanning every subscriber.
+
+Triggered alerts are queued and handed to a pluggable sender in batches
+by a background delivery thread, so a slow or failing gateway never
+blocks price ingestion.
+The index lives in each worker process and is rebuilt from the database
+every ALERT_INDEX_TTL seconds, so subscriptions created through another
+worker are picked up without a query per tick. Previous prices are not
+kept in the process: each batch reads every market's last price before
+its ticks from the database, so a tick ingested by another worker is the
+baseline here too and the same crossing never fires twice.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque, namedtuple
+
+from werkzeug.utils import import_string
+
+from app.models import AlertSubscription, MarketData
+
+logger = logging.getLogger(__name__)
+
+ABOVE, BELOW = "above", "below"
+
+# Snapshot of an ingested MarketData row, taken before its commit expires it
+Tick = namedtuple("Tick", "id crop_type source price data_timestamp")
+
+
+class ThresholdIndex:
+    """Sorted (threshold, subscription id) pairs for one direction."""
+
+    def __init__(self):
+        self._thresholds = []
+        self._ids = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, threshold, sub_id):
+        index = bisect_right(self._thresholds, threshold)
+        self._thresholds.insert(index, threshold)
+        self._ids.insert(index, sub_id)
+
+    def remove(self, threshold, sub_id):
+        index = bisect_left(self._thresholds, threshold)
+        while index < len(self._ids) and self._thresholds[index] == threshold:
+            if self._ids[index] == sub_id:
+                del self._thresholds[index]
+                del self._ids[index]
+                return
+            index += 1
+
+    def between(self, low, high, inclusive_high):
+        """Ids with thresholds in (low, high] or [low, high)."""
+        if inclusive_high:
+            start = bisect_right(self._thresholds, low)
+            end = bisect_right(self._thresholds, high)
+        else:
+            start = bisect_left(self._thresholds, low)
+            end = bisect_left(self._thresholds, high)
+        return self._ids[start:end]
+
+
+class AlertMatcher:
+    """
+    Finds the subscriptions crossed by each incoming price tick.
+
+    A subscription with market None listens to every market for its crop.
+    """
+
+    def __init__(self):
+        self._indexes = {}  # (crop, market) -> {ABOVE: index, BELOW: index}
+        self._subscriptions = {}  # id -> subscription dict
+
+    def add(self, subscription):
+        key = (subscription["crop_type"], subscription["market"])
+        indexes = self._indexes.setdefault(
+            key, {ABOVE: ThresholdIndex(), BELOW: ThresholdIndex()})
+        indexes[subscription["direction"]].add(
+            subscription["threshold"], subscription["id"])
+        self._subscriptions[subscription["id"]] = subscription
+
+    def remove(self, sub_id):
+        subscription = self._subscriptions.pop(sub_id, None)
+        if subscription is None:
+            return
+        key = (subscription["crop_type"], subscription["market"])
+        self._indexes[key][subscription["direction"]].remove(
+            subscription["threshold"], sub_id)
+
+    def match(self, crop_type, market, previous, price):
+        """
+        Return the subscriptions crossed by a move from ``previous`` to ``price``.
+
+        A rise fires "above" thresholds in (previous, price] and a fall
+        fires "below" thresholds in [price, previous). With no previous
+        price there is nothing to cross.
+        """
+        if previous is None or previous == price:
+            return []
+
+        keys = [(crop_type, market)]
+        if market is not None:  # Otherwise the any-market key is the same key
+            keys.append((crop_type, None))
+        triggered = []
+        for key in keys:
+            indexes = self._indexes.get(key)
+            if indexes is None:
+                continue
+            if price > previous:  # Rose through thresholds in (previous, price]
+                ids = indexes[ABOVE].between(previous, price, inclusive_high=True)
+            else:  # Fell through thresholds in [price, previous)
+                ids = indexes[BELOW].between(price, previous, inclusive_high=False)
+            triggered.extend(self._subscriptions[sub_id] for sub_id in ids)
+        return triggered
+
+
+class LogSender:
+    """Development sender that writes alerts to the application log."""
+
+    def send_batch(self, alerts):
+        for alert in alerts:
+            logger.info(
+                "Price alert for user %s: %s at %s is %s %s (now %s)",
+                alert["user_id"], alert["crop_type"], alert["market"],
+                alert["direction"], alert["threshold"], alert["price"])
+
+
+class AlertEngine:
+    """Process-wide matcher plus a batching delivery queue."""
+
+    def __init__(self, sender=None, batch_size=100, index_ttl=60.0,
+                 retry_interval=5.0, max_queue=10000):
+        self.sender = sender or LogSender()
+        self.batch_size = batch_size
+        self.index_ttl = index_ttl
+        self.retry_interval = retry_interval
+        self._matcher = None
+        self._built_at = 0.0
+        self._queue = deque(maxlen=max_queue)  # Oldest alerts drop when full
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _ensure_index(self):
+        """Rebuild the matcher from the database when it is stale."""
+        if self._matcher is not None and time.monotonic() - self._built_at < self.index_ttl:
+            return
+        matcher = AlertMatcher()
+        for subscription in AlertSubscription.query.all():
+            matcher.add(subscription.to_dict())
+        self._matcher = matcher
+        self._built_at = time.monotonic()
+
+    def _previous_price(self, tick):
+        """A market's last stored price from before ``tick``, or None."""
+        # Walks ix_market_data_crop_time backwards from the tick's timestamp
+        previous = (MarketData.query
+                    .with_entities(MarketData.price)
+                    .filter(MarketData.crop_type == tick.crop_type,
+                            MarketData.source == tick.source,
+                            MarketData.data_timestamp < tick.data_timestamp)
+                    .order_by(MarketData.data_timestamp.desc())
+                    .first())
+        return None if previous is None else previous.price
+
+    def subscribe(self, subscription):
+        """Index a newly committed subscription in this process."""
+        with self._lock:
+            if self._matcher is not None:
+                self._matcher.add(subscription.to_dict())
+
+    def unsubscribe(self, sub_id):
+        """Drop a deleted subscription from this process's index."""
+        with self._lock:
+            if self._matcher is not None:
+                self._matcher.remove(sub_id)
+
+    def process(self, ticks):
+        """
+        Match committed ticks and queue the triggered alerts for delivery.
+
+        Ticks are replayed per market in timestamp order, starting from
+        the last price stored before the market's earliest tick, so one
+        query per market in the batch.
+        """
+        markets = defaultdict(list)
+        for tick in ticks:
+            markets[(tick.crop_type, tick.source)].append(tick)
+        with self._lock:
+            self._ensure_index()
+            for (crop_type, market), market_ticks in markets.items():
+                market_ticks.sort(key=lambda tick: (tick.data_timestamp, tick.id))
+                previous = self._previous_price(market_ticks[0])
+                for tick in market_ticks:
+                    for subscription in self._matcher.match(
+                            crop_type, market, previous, tick.price):
+                        self._queue.append(dict(
+                            subscription, market=market, price=tick.price,
+                            market_data_id=tick.id))
+                    previous = tick.price
+            if self._queue:
+                self._start_delivery()
+                self._wakeup.set()
+
+    def _start_delivery(self):
+        """Start the delivery thread if it isn't running; caller holds the lock."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._deliver, name="alert-delivery", daemon=True)
+            self._thread.start()
+
+    def _deliver(self):
+        """Delivery loop: flush when woken, retrying failed batches later."""
+        while True:
+            self._wakeup.wait(self.retry_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Deliver queued alerts in batches; return how many were sent."""
+        sent = 0
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft()
+                         for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return sent
+            try:
+                self.sender.send_batch(batch)
+            except Exception:
+                logger.exception("Alert delivery failed; requeueing %d alerts", len(batch))
+                with self._lock:
+                    self._queue.extendleft(reversed(batch))
+                return sent
+            sent += len(batch)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine(app):
+    """Return this process's alert engine, configured from the app on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            config = app.config
+            _engine = AlertEngine(
+                sender=import_string(config["ALERT_SENDER"])(),
+                batch_size=config["ALERT_BATCH_SIZE"],
+                index_ttl=config["ALERT_INDEX_TTL"],
+                retry_interval=config["ALERT_RETRY_INTERVAL"],
+                max_queue=config["ALERT_MAX_QUEUE"],
+            )
+        return _engine
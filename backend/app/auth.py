@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+JWT verification shared within a request and across batch sub-requests.
+
+A request can ask for its bearer token to be decoded several times:
+admission control reads the identity, then ``@jwt_required`` verifies it,
+and /api/batch runs every sub-request through the views again with the
+same Authorization header. CachingJWTManager keeps the first successful
+decode in the WSGI environ, keyed by the encoded token, and answers later
+decodes of the same token from it. The batch view hands its entry to each
+sub-request, so a batch costs one signature check and one blocklist
+check however many calls it carries. The entry is shared by reference:
+once a sub-request revokes the token (POST /api/logout), the rest of the
+batch stops trusting it and is checked against the denylist again.
+
+This overrides JWTManager._decode_jwt_from_config, which every decode in
+flask_jwt_extended goes through; the library is pinned in
+requirements.txt and tests/test_auth.py fails if the hook moves.
+"""
+from flask import has_request_context, request
+from flask_jwt_extended import JWTManager
+
+from app.admission import SUBREQUEST_KEY
+
+# VerifiedToken for this request's token; clients cannot set environ keys
+# through HTTP headers
+DECODED_JWT_KEY = "gaine.decoded_jwt"
+
+
+class VerifiedToken:
+    """
+    A decoded token, shared with the request's batch sub-requests.
+
+    Attributes:
+        encoded (str): The encoded JWT.
+        claims (dict): Its decoded claims.
+        revoked (bool): Set once the token is revoked mid-request.
+    """
+
+    def __init__(self, encoded, claims):
+        self.encoded = encoded
+        self.claims = claims
+        self.revoked = False
+
+
+class CachingJWTManager(JWTManager):
+    """JWTManager that decodes a request's token at most once."""
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        if not has_request_context() or csrf_value is not None:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        decoded = request.environ.get(DECODED_JWT_KEY)
+        if decoded is not None and not decoded.revoked and decoded.encoded == encoded_token:
+            return decoded.claims
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        # Only cache tokens that passed the expiry check, and never in a
+        # sub-request, where an entry means the batch verified the token
+        if not allow_expired and not request.environ.get(SUBREQUEST_KEY):
+            request.environ[DECODED_JWT_KEY] = VerifiedToken(encoded_token, claims)
+        return claims
+
+
+def verified_by_batch(claims):
+    """True if a batch sub-request's token already passed the batch's checks."""
+    decoded = request.environ.get(DECODED_JWT_KEY)
+    return (bool(request.environ.get(SUBREQUEST_KEY)) and decoded is not None
+            and not decoded.revoked and decoded.claims.get("jti") == claims.get("jti"))
+
+
+def forget_verified_token(jti):
+    """Stop trusting a just-revoked token for the rest of this request's batch."""
+    if not has_request_context():
+        return
+    decoded = request.environ.get(DECODED_JWT_KEY)
+    if decoded is not None and decoded.claims.get("jti") == jti:
+        decoded.revoked = True
+
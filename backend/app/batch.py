@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+"""
+Multiplexed dispatch of API sub-requests for /api/batch.
+
+Low-bandwidth clients send one request describing several API calls.
+Each call is routed through the normal blueprint views, so validation
+and authorization behave exactly as if it had been sent on its own.
+Writes run in order on the batch's own database session; runs of
+consecutive reads are dispatched concurrently, each on a worker thread
+with its own application context. Sub-requests reuse the bearer token
+the batch view already verified instead of decoding and checking it
+again, and a profiled batch request has those worker threads sampled
+into its profile.
+"""
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from flask import has_request_context, request
+from werkzeug.exceptions import HTTPException
+
+from app import db
+from app.admission import SUBREQUEST_KEY
+from app.auth import DECODED_JWT_KEY
+from app.profiling import PARENT_PROFILE_KEY, PROFILE_KEY
+
+# Endpoints that make no sense inside a batch
+EXCLUDED_ENDPOINTS = {"main_routes.batch", "main_routes.stream_market_data"}
+READ_METHODS = {"GET"}
+ALLOWED_METHODS = {"GET", "POST", "PUT", "DELETE"}
+
+
+def _error(status, message):
+    """Build the result entry for a sub-request that was not dispatched."""
+    return {"status": status, "body": {"error": message}}
+
+
+def _resolve(app, item):
+    """
+    Validate a sub-request and match it to a view.
+
+    Returns:
+        dict: Error result, or None if the sub-request can be dispatched.
+    """
+    if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+        return _error(400, "Each sub-request needs a path")
+    method = str(item.get("method", "GET")).upper()
+    if method not in ALLOWED_METHODS:
+        return _error(405, "Method not allowed")
+
+    adapter = app.url_map.bind("localhost")
+    try:
+        endpoint, _ = adapter.match(urlsplit(item["path"]).path, method=method)
+    except HTTPException as exc:
+        return _error(exc.code, exc.description)
+    if endpoint in EXCLUDED_ENDPOINTS:
+        return _error(400, "Endpoint cannot be batched")
+    return None
+
+
+def _subrequest_environ():
+    """Environ entries every sub-request inherits from the batch request."""
+    # Sub-requests were admitted as part of the batch itself
+    environ = {SUBREQUEST_KEY: True}
+    if has_request_context():
+        # Set only when the batch carried a token, which its view verified;
+        # shared, so once a sub-request revokes it the rest stop trusting it
+        if DECODED_JWT_KEY in request.environ:
+            environ[DECODED_JWT_KEY] = request.environ[DECODED_JWT_KEY]
+        if PROFILE_KEY in request.environ:
+            environ[PARENT_PROFILE_KEY] = request.environ[PROFILE_KEY]
+    return environ
+
+
+def _dispatch(app, item, headers, environ):
+    """Run one sub-request through the full Flask dispatch pipeline."""
+    method = str(item.get("method", "GET")).upper()
+    kwargs = {"method": method, "headers": headers, "environ_base": environ}
+    if "body" in item:
+        kwargs["json"] = item["body"]
+
+    with app.test_request_context(item["path"], **kwargs):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Batched %s %s failed", method, item["path"])
+            return _error(500, "Internal server error")
+
+    body = response.get_json(silent=True)
+    if body is None:
+        body = response.get_data(as_text=True)
+    return {"status": response.status_code, "body": body}
+
+
+def _dispatch_isolated(app, item, headers, environ):
+    """Run a read on a worker thread with its own app context and session."""
+    with app.app_context():
+        return _dispatch(app, item, headers, environ)
+
+
+def run_batch(app, items, headers, max_workers=4):
+    """
+    Execute a list of sub-requests and collect their results in order.
+
+    Args:
+        app (Flask): The application to dispatch into.
+        items (list): Sub-requests as dicts with method, path and body.
+        headers (dict): Headers forwarded to every sub-request.
+        max_workers (int): Upper bound on concurrently running reads.
+
+    Returns:
+        list: One {"status", "body"} dict per sub-request.
+    """
+    results = [None] * len(items)
+    pending_reads = []
+    environ = _subrequest_environ()
+
+    def flush_reads(executor):
+        futures = [(index, executor.submit(_dispatch_isolated, app, item, headers, environ))
+                   for index, item in pending_reads]
+        for index, future in futures:
+            results[index] = future.result()
+        pending_reads.clear()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index, item in enumerate(items):
+            error = _resolve(app, item)
+            if error:
+                results[index] = error
+                continue
+            if str(item.get("method", "GET")).upper() in READ_METHODS:
+                pending_reads.append((index, item))
+                continue
+            # A write must observe every read queued before it, and the
+            # reads after it must observe the write.
+            flush_reads(executor)
+            results[index] = _dispatch(app, item, headers, environ)
+        flush_reads(executor)
+
+    return results
+
+
+def encode_results(results, accept_encoding, min_size=1024):
+    """
+    Serialize batch results, gzip-compressing them when worthwhile.
+
+    Returns:
+        tuple: (payload bytes, extra response headers)
+    """
+    payload = json.dumps({"responses": results}, default=str).encode("utf-8")
+    if "gzip" in (accept_encoding or "") and len(payload) >= min_size:
+        return gzip.compress(payload), {"Content-Encoding": "gzip",
+                                        "Vary": "Accept-Encoding"}
+    return payload, {}
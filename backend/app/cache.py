@@ -0,0 +1,323 @@
+#!/usr/bin/python3
+"""
+Per-user read-through cache for serialized API payloads.
+
+The records, predictions and user payloads change rarely but are
+re-queried and re-serialized on every app open. ReadCache stores the
+serialized JSON bytes keyed by (user, resource, variant) in a size-bounded
+LRU backend, and SQLAlchemy session events invalidate exactly the users
+whose rows a transaction touched once it commits.
+
+Backends (READ_CACHE_BACKEND):
+    - "memory": in-process LRU (default). Invalidation is only seen by
+      the worker that committed, so entries also expire after
+      READ_CACHE_TTL seconds; that bounds how stale another worker's
+      copy can get. Use the SQLite backend to share invalidations.
+    - "sqlite:///path/to/cache.db": a local SQLite file shared by all
+      workers on the box.
+    - "none": caching disabled.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from app import db
+from app.models import Prediction, Record, Tombstone, User
+
+# Cache owner for payloads that aren't scoped to one user
+ALL_USERS = "*"
+PENDING_KEY = "read_cache_users"
+EVERYONE = object()  # Marker: a bulk statement touched unknown users
+
+
+class MemoryBackend:
+    """
+    Thread-safe in-process LRU bounded by total payload bytes.
+
+    Entries expire ``ttl`` seconds after they are stored, since commits
+    made by other workers never invalidate them.
+    """
+
+    def __init__(self, max_bytes, ttl=30.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (owner, payload, expires)
+        self._owners = {}  # owner -> set of keys
+        self._generations = {}  # owner -> invalidation count
+        self._epoch = 0  # Bumped by clear()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def generation(self, owner):
+        with self._lock:
+            return (self._epoch, self._generations.get(owner, 0))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, owner, key, payload, generation):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != (self._epoch, self._generations.get(owner, 0)):
+                return  # Invalidated while the payload was being built
+            self._discard(key)
+            self._entries[key] = (owner, payload, time.monotonic() + self.ttl)
+            self._owners.setdefault(owner, set()).add(key)
+            self._size += len(payload)
+            while self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, owners):
+        with self._lock:
+            for owner in owners:
+                self._generations[owner] = self._generations.get(owner, 0) + 1
+                for key in list(self._owners.get(owner, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._owners.clear()
+            self._size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        owner, payload, _ = entry
+        self._size -= len(payload)
+        keys = self._owners.get(owner)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._owners[owner]
+
+
+class SQLiteBackend:
+    """
+    LRU cache in a local SQLite file shared by every worker on the box.
+
+    Access times are only rewritten when older than ``touch_interval``
+    seconds, so cache hits rarely need a write.
+    """
+
+    def __init__(self, path, max_bytes, touch_interval=10.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS read_cache ("
+            " key TEXT PRIMARY KEY, owner TEXT NOT NULL,"
+            " payload BLOB NOT NULL, size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_read_cache_owner"
+                     " ON read_cache (owner)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_read_cache_accessed"
+                     " ON read_cache (accessed)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS read_cache_generations ("
+            " owner TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; write paths open explicit IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # Losing a cache entry is harmless
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _generation(conn, owner):
+        # Empty owner holds the global epoch bumped by clear()
+        rows = conn.execute(
+            "SELECT owner, generation FROM read_cache_generations WHERE owner IN (?, ?)",
+            (str(owner), "")).fetchall()
+        found = dict(rows)
+        return (found.get("", 0), found.get(str(owner), 0))
+
+    def generation(self, owner):
+        return self._generation(self._connect(), owner)
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT payload, accessed FROM read_cache WHERE key = ?",
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > self.touch_interval:
+            conn.execute("UPDATE read_cache SET accessed = ? WHERE key = ?",
+                         (now, key))
+        return row[0]
+
+    def set(self, owner, key, payload, generation):
+        if len(payload) > self.max_bytes:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._generation(conn, owner) != generation:
+                return  # Invalidated while the payload was being built
+            conn.execute("INSERT OR REPLACE INTO read_cache VALUES (?, ?, ?, ?, ?)",
+                         (key, str(owner), payload, len(payload), time.time()))
+            total = conn.execute("SELECT SUM(size) FROM read_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop the least recently used quarter in one statement
+                conn.execute(
+                    "DELETE FROM read_cache WHERE key IN (SELECT key FROM read_cache"
+                    " ORDER BY accessed LIMIT (SELECT COUNT(*) / 4 + 1 FROM read_cache))")
+        finally:
+            conn.execute("COMMIT")
+
+    def _bump(self, conn, owner):
+        conn.execute(
+            "INSERT INTO read_cache_generations VALUES (?, 1) ON CONFLICT(owner)"
+            " DO UPDATE SET generation = generation + 1", (owner,))
+
+    def invalidate(self, owners):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for owner in owners:
+                self._bump(conn, str(owner))
+                conn.execute("DELETE FROM read_cache WHERE owner = ?", (str(owner),))
+        finally:
+            conn.execute("COMMIT")
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._bump(conn, "")  # Empty owner holds the global epoch
+            conn.execute("DELETE FROM read_cache")
+        finally:
+            conn.execute("COMMIT")
+
+
+class ReadCache:
+    """Read-through facade over a cache backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_or_build(self, owner, resource, variant, build):
+        """
+        Return cached payload bytes, building and storing them on a miss.
+
+        Args:
+            owner: User id the payload belongs to, or ALL_USERS.
+            resource (str): Payload name, e.g. "records".
+            variant (str): Distinguishes parameterized forms of a payload.
+            build (callable): Returns the payload as JSON-serializable data.
+
+        Returns:
+            bytes: Serialized JSON payload.
+        """
+        key = f"{owner}:{resource}:{variant}"
+        payload = self.backend.get(key)
+        if payload is None:
+            generation = self.backend.generation(owner)
+            payload = current_app.json.dumps(build()).encode("utf-8")
+            self.backend.set(owner, key, payload, generation)
+        return payload
+
+    def invalidate(self, owners):
+        """Drop every payload belonging to ``owners``."""
+        if EVERYONE in owners:
+            self.backend.clear()
+        else:
+            self.backend.invalidate(owners)
+
+
+def create_backend(spec, max_bytes, ttl=30.0):
+    """Build the backend named by READ_CACHE_BACKEND, or None if disabled."""
+    if spec == "none":
+        return None
+    if spec == "memory":
+        return MemoryBackend(max_bytes, ttl)
+    if spec.startswith("sqlite:///"):
+        return SQLiteBackend(spec[len("sqlite:///"):], max_bytes)
+    raise ValueError(f"Unknown READ_CACHE_BACKEND: {spec}")
+
+
+def _owners_of(instance):
+    """Cache owners whose payloads depend on a changed ORM instance."""
+    if isinstance(instance, User):
+        return (instance.id,)
+    if isinstance(instance, Prediction):
+        return (instance.user_id, ALL_USERS)  # get_predictions lists everyone's
+    if isinstance(instance, (Record, Tombstone)):
+        return (instance.user_id,)
+    return ()
+
+
+def _pending(session):
+    return session.info.setdefault(PENDING_KEY, set())
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    pending = _pending(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        pending.update(_owners_of(instance))
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (User, Record, Prediction):
+        _pending(orm_execute_state.session).add(EVERYONE)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_committed(session):
+    owners = session.info.pop(PENDING_KEY, None)
+    cache = current_app.extensions.get("read_cache") if has_app_context() else None
+    if owners and cache is not None:
+        cache.invalidate(owners)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def init_read_cache(app):
+    """Attach the configured read cache to the application."""
+    backend = create_backend(app.config["READ_CACHE_BACKEND"],
+                             app.config["READ_CACHE_MAX_BYTES"],
+                             app.config["READ_CACHE_TTL"])
+    if backend is not None:
+        app.extensions["read_cache"] = ReadCache(backend)
+
+
+def cached_json(owner, resource, variant, build):
+    """
+    Return cached JSON bytes for a payload, or build them uncached.
+
+    Views call this so they work the same with caching disabled.
+    """
+    cache = current_app.extensions.get("read_cache")
+    if cache is None:
+        return current_app.json.dumps(build()).encode("utf-8")
+    return cache.get_or_build(owner, resource, variant, build)
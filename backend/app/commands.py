@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+Flask CLI commands for Gaine Africa maintenance tasks.
+
+Run with ``flask --app wsgi <command>`` from the backend directory.
+"""
+import time
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command("rebuild-sketches")
+@with_appcontext
+def rebuild_sketches_command():
+    """Recompute all price sketches from the market_data table."""
+    from app.services import rebuild_price_sketches
+
+    written = rebuild_price_sketches()
+    click.echo(f"Rebuilt {written} price sketches.")
+
+
+@click.command("prune-tombstones")
+@with_appcontext
+def prune_tombstones_command():
+    """Delete sync tombstones older than the retention window."""
+    from app.services import prune_tombstones
+
+    days = current_app.config["SYNC_TOMBSTONE_RETENTION_DAYS"]
+    removed = prune_tombstones(timedelta(days=days))
+    click.echo(f"Removed {removed} tombstones older than {days} days.")
+
+
+@click.command("prune-revoked-tokens")
+@with_appcontext
+def prune_revoked_tokens_command():
+    """Delete denylist entries for tokens that have expired."""
+    from app.revocation import prune_revoked_tokens
+
+    removed = prune_revoked_tokens()
+    click.echo(f"Removed {removed} expired revoked tokens.")
+
+
+@click.command("disease-risk")
+@click.option("--weather", "weather_path", type=click.Path(exists=True, dir_okay=False),
+              help="Weather JSON file (default: DISEASE_WEATHER_PATH).")
+@click.option("--window", "window_days", type=int,
+              help="Days of weather to score (default: DISEASE_RISK_WINDOW_DAYS).")
+@with_appcontext
+def disease_risk_command(weather_path, window_days):
+    """Score crop disease risk for every farmer and store the results."""
+    from app.disease import run_disease_risk
+
+    summary = run_disease_risk(
+        weather_path or current_app.config["DISEASE_WEATHER_PATH"],
+        window_days or current_app.config["DISEASE_RISK_WINDOW_DAYS"],
+    )
+    levels = ", ".join(f"{count} {level}" for level, count in summary["levels"].items())
+    click.echo(f"Scored {summary['scored']} crop risks for {summary['users']} users "
+               f"through {summary['window_end']} in {summary['seconds']}s ({levels}).")
+
+
+@click.command("warm-forecasts")
+@with_appcontext
+def warm_forecasts_command():
+    """Fold all market history into the forecast state file."""
+    from app.forecasting import get_price_forecaster
+
+    state_path = current_app.config["FORECAST_STATE_PATH"]
+    if not state_path:
+        raise click.UsageError("Set FORECAST_STATE_PATH so workers can load the warmed state.")
+    forecaster = get_price_forecaster(current_app)
+    started = time.perf_counter()
+    forecaster.refresh(force=True)
+    click.echo(f"Warmed price forecasts through {forecaster.day} in "
+               f"{time.perf_counter() - started:.1f}s ({state_path}).")
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the application's CLI."""
+    app.cli.add_command(rebuild_sketches_command)
+    app.cli.add_command(prune_tombstones_command)
+    app.cli.add_command(prune_revoked_tokens_command)
+    app.cli.add_command(disease_risk_command)
+    app.cli.add_command(warm_forecasts_command)
@@ -0,0 +1,238 @@
+#!/usr/bin/python3
+"""
+Crop disease risk scoring from weather data.
+
+Each disease model is a rule-based weather criterion evaluated over an
+array of hourly temperature and relative humidity shaped
+(locations, days, 24), so one call scores every location at once. Farmers
+are then mapped onto their location's result by crop (``User.crop``) with
+NumPy fancy indexing, and the scores are written to the disease_risks
+table for quick lookup by the API.
+
+Models:
+    - late_blight (potato, tomato): Hutton criteria. A "humid day" has a
+      minimum temperature of at least 10°C and at least 6 hours with
+      relative humidity of 90% or more. Two consecutive humid days form a
+      Hutton period, which signals high blight risk.
+    - onion_downy_mildew (onion): simplified DOWNCAST. A "sporulation
+      night" needs at least 4 hours between 00:00 and 07:00 with
+      relative humidity of 95% or more and temperatures of 4-24°C, after
+      a day that stayed below 24°C.
+
+Weather comes from a JSON file (DISEASE_WEATHER_PATH) holding hourly
+series per location; see fixtures/weather.json for the format.
+"""
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import DiseaseRisk, User
+
+LEVELS = np.array(["low", "moderate", "high"])
+
+
+class WeatherGrid:
+    """
+    Hourly weather for several locations over the same whole days.
+
+    Attributes:
+        locations (list): Location names, one per row.
+        first_day (date): Date of the first day in the arrays.
+        temperature (ndarray): Degrees Celsius, shaped (locations, days, 24).
+        humidity (ndarray): Relative humidity %, shaped (locations, days, 24).
+    """
+
+    def __init__(self, locations, first_day, temperature, humidity):
+        self.locations = locations
+        self.first_day = first_day
+        self.temperature = temperature
+        self.humidity = humidity
+
+    @property
+    def days(self):
+        return self.temperature.shape[1]
+
+    @property
+    def last_day(self):
+        return self.first_day + timedelta(days=self.days - 1)
+
+    @classmethod
+    def from_json(cls, path):
+        """
+        Load hourly series from a JSON file.
+
+        The file holds ``start`` (ISO timestamp of the first hour) and
+        ``locations`` mapping each name to equal-length ``temperature`` and
+        ``humidity`` lists. Hours before the first midnight and after the
+        last complete day are dropped.
+        """
+        with open(path) as source:
+            data = json.load(source)
+        start = datetime.fromisoformat(data["start"])
+        locations = sorted(data["locations"])
+        temperature = np.array([data["locations"][name]["temperature"]
+                                for name in locations], dtype=float)
+        humidity = np.array([data["locations"][name]["humidity"]
+                             for name in locations], dtype=float)
+
+        skip = (24 - start.hour) % 24
+        days = (temperature.shape[1] - skip) // 24
+        end = skip + days * 24
+        first_day = (start + timedelta(hours=skip)).date()
+        return cls(locations, first_day,
+                   temperature[:, skip:end].reshape(len(locations), days, 24),
+                   humidity[:, skip:end].reshape(len(locations), days, 24))
+
+    def window(self, days):
+        """Temperature and humidity for the last ``days`` days."""
+        return self.temperature[:, -days:], self.humidity[:, -days:]
+
+
+def late_blight(temperature, humidity):
+    """
+    Hutton criteria for potato and tomato late blight.
+
+    The first day of the arrays is lead-in context for the
+    consecutive-day check only.
+
+    Returns:
+        tuple: (score, events, level) arrays, one entry per location. The
+            score is the share of scored days that were humid days, and
+            events counts Hutton periods.
+    """
+    humid_hours = (humidity >= 90).sum(axis=2)
+    humid_days = (temperature.min(axis=2) >= 10) & (humid_hours >= 6)
+    periods = humid_days[:, 1:] & humid_days[:, :-1]
+    score = humid_days[:, 1:].mean(axis=1)
+    events = periods.sum(axis=1)
+    level = np.select([events >= 1, score > 0], [2, 1], default=0)
+    return score, events, level
+
+
+def onion_downy_mildew(temperature, humidity):
+    """
+    Simplified DOWNCAST sporulation model for onion downy mildew.
+
+    The first day of the arrays is lead-in context for the previous-day
+    temperature check only.
+
+    Returns:
+        tuple: (score, events, level) arrays, one entry per location. The
+            score is the share of scored nights that allowed sporulation,
+            and events counts those nights.
+    """
+    night_t = temperature[:, 1:, 0:7]
+    night_rh = humidity[:, 1:, 0:7]
+    favourable = (night_rh >= 95) & (night_t >= 4) & (night_t <= 24)
+    cool_day_before = temperature[:, :-1].max(axis=2) < 24
+    nights = (favourable.sum(axis=2) >= 4) & cool_day_before
+    score = nights.mean(axis=1)
+    events = nights.sum(axis=1)
+    level = np.select([events >= 3, events >= 1], [2, 1], default=0)
+    return score, events, level
+
+
+DISEASE_MODELS = {
+    "late_blight": late_blight,
+    "onion_downy_mildew": onion_downy_mildew,
+}
+
+CROP_DISEASES = {
+    "potato": ("late_blight",),
+    "tomato": ("late_blight",),
+    "onion": ("onion_downy_mildew",),
+}
+
+
+def _crop_key(crop):
+    """Normalize a free-text crop name, e.g. "Potatoes" -> "potato"."""
+    crop = (crop or "").strip().lower()
+    for suffix in ("es", "s"):
+        if crop not in CROP_DISEASES and crop.endswith(suffix):
+            crop = crop[:-len(suffix)]
+    return crop
+
+
+def score_users(weather, users, window_days):
+    """
+    Score every (user, disease) pair the users' crops are susceptible to.
+
+    Args:
+        weather (WeatherGrid): Hourly weather per location.
+        users (list): (user_id, location, crop) tuples.
+        window_days (int): Days of weather each score covers.
+
+    Returns:
+        list: Row dicts for DiseaseRisk, one per scored pair. Users whose
+            location has no weather or whose crop has no model are skipped.
+    """
+    days = min(window_days + 1, weather.days)  # One lead-in day
+    if days < 2:
+        raise ValueError("Need at least two days of weather to score disease risk")
+    temperature, humidity = weather.window(days)
+    location_index = {name.strip().lower(): i for i, name in enumerate(weather.locations)}
+
+    # Group users per disease with their location rows, then gather
+    # each disease's per-location results in one indexing operation
+    grouped = {disease: ([], [], []) for disease in DISEASE_MODELS}
+    for user_id, location, crop in users:
+        row = location_index.get((location or "").strip().lower())
+        if row is None:
+            continue
+        crop_key = _crop_key(crop)
+        for disease in CROP_DISEASES.get(crop_key, ()):
+            ids, rows, crops = grouped[disease]
+            ids.append(user_id)
+            rows.append(row)
+            crops.append(crop_key)
+
+    window_end = weather.last_day
+    now = datetime.utcnow()
+    results = []
+    for disease, (ids, rows, crops) in grouped.items():
+        if not ids:
+            continue
+        score, events, level = DISEASE_MODELS[disease](temperature, humidity)
+        rows = np.array(rows)
+        user_scores = np.round(score[rows], 4).tolist()
+        user_events = events[rows].tolist()
+        user_levels = LEVELS[level[rows]].tolist()
+        results.extend({
+            "user_id": user_id, "crop": crop, "disease": disease,
+            "score": user_score, "events": user_event, "level": user_level,
+            "window_end": window_end, "created_at": now, "updated_at": now,
+        } for user_id, crop, user_score, user_event, user_level
+            in zip(ids, crops, user_scores, user_events, user_levels))
+    return results
+
+
+def run_disease_risk(weather_path, window_days):
+    """
+    Score all users against the weather file and replace stored risks.
+
+    Returns:
+        dict: Counts of users read, rows written, rows per level, and the
+            elapsed seconds.
+    """
+    started = time.perf_counter()
+    weather = WeatherGrid.from_json(weather_path)
+    users = User.query.with_entities(User.id, User.location, User.crop).all()
+    rows = score_users(weather, users, window_days)
+
+    DiseaseRisk.query.delete()
+    db.session.bulk_insert_mappings(DiseaseRisk, rows)
+    db.session.commit()
+
+    levels = dict.fromkeys(LEVELS.tolist(), 0)
+    for row in rows:
+        levels[row["level"]] += 1
+    return {
+        "users": len(users),
+        "scored": len(rows),
+        "levels": levels,
+        "window_end": weather.last_day.isoformat(),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
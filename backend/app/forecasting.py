@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+"""
+Server-side market price forecasting.
+
+PriceForecaster fits a damped-trend, additive seasonal exponential
+smoothing model (Holt-Winters) to the daily mean price of every
+(crop, market) series at once. Model state lives in NumPy arrays with one
+row per series, so each day of history is a single vectorized update
+across all crops and markets. The fitted state is cached in-process (and
+optionally on disk); new market_data rows are folded in incrementally by
+id high-water mark instead of refitting from scratch.
+
+Folding in the whole history is slow on a large table, so it never runs
+inside a request: ``flask warm-forecasts`` writes the state file ahead of
+time, and a worker that starts cold warms up in a background thread while
+forecast requests get 503 with Retry-After.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import MarketData
+from app.polling import HighWaterMark
+
+logger = logging.getLogger(__name__)
+
+
+class PriceForecaster:
+    """
+    Vectorized Holt-Winters state for all (crop, market) price series.
+
+    Attributes:
+        alpha (float): Level smoothing factor.
+        beta (float): Trend smoothing factor.
+        gamma (float): Seasonal smoothing factor.
+        phi (float): Trend damping factor (1.0 = undamped).
+        period (int): Season length in days (7 weekly, 365 yearly).
+    """
+
+    def __init__(self, alpha=0.3, beta=0.05, gamma=0.2, phi=0.98, period=7,
+                 state_path=None, refresh_interval=30.0):
+        self.alpha, self.beta, self.gamma, self.phi = alpha, beta, gamma, phi
+        self.period = period
+        self.state_path = state_path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._keys = []
+        self._index = {}
+        self._level = np.empty(0)
+        self._trend = np.empty(0)
+        self._season = np.empty((0, period))
+        self._day = None  # Last fully folded-in day
+        self._mark = HighWaterMark()  # MarketData ids read so far
+        self._mark.reset(0)
+        self._pending = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+        self._last_refresh = 0.0
+        self._loaded = False
+        self._warmed = False
+        self._warmer = None
+        self._warmer_lock = threading.Lock()  # Not _lock: the warm-up holds that
+
+    def _series(self, key):
+        """Return the row for a series, growing the state arrays if new."""
+        row = self._index.get(key)
+        if row is None:
+            row = len(self._keys)
+            self._keys.append(key)
+            self._index[key] = row
+            self._level = np.append(self._level, np.nan)
+            self._trend = np.append(self._trend, 0.0)
+            self._season = np.vstack([self._season, np.zeros((1, self.period))])
+        return row
+
+    def _step(self, day, observed):
+        """
+        Fold one day of observations into every series at once.
+
+        Args:
+            day (date): The day being folded in.
+            observed (ndarray): Daily mean price per series, NaN if none.
+        """
+        slot = day.toordinal() % self.period
+        level, trend = self._level, self._trend
+        season = self._season[:, slot]
+        has_obs = ~np.isnan(observed)
+        started = ~np.isnan(level)
+
+        new_level = self.alpha * (observed - season) + \
+            (1 - self.alpha) * (level + self.phi * trend)
+        new_trend = self.beta * (new_level - level) + \
+            (1 - self.beta) * self.phi * trend
+        new_season = self.gamma * (observed - new_level) + \
+            (1 - self.gamma) * season
+
+        update = has_obs & started
+        first = has_obs & ~started
+        carry = ~has_obs & started  # No trades: follow the damped trend
+
+        self._level = np.where(update, new_level,
+                               np.where(first, observed,
+                                        np.where(carry, level + self.phi * trend,
+                                                 level)))
+        self._trend = np.where(update, new_trend,
+                               np.where(carry, self.phi * trend, trend))
+        self._season[:, slot] = np.where(update, new_season, season)
+        self._day = day
+
+    def _ingest(self, batch_size=10000):
+        """Read new MarketData rows into the pending per-day buckets."""
+        while True:
+            rows = (db.session.query(MarketData.id, MarketData.crop_type,
+                                     MarketData.source, MarketData.price,
+                                     MarketData.data_timestamp)
+                    .filter(self._mark.criterion(MarketData.id))
+                    .order_by(MarketData.id)
+                    .limit(batch_size)
+                    .all())
+            for row_id, crop_type, source, price, timestamp in rows:
+                day = (timestamp or datetime.utcnow()).date()
+                if self._day is None or day > self._day:
+                    bucket = self._pending[day][self._series((crop_type, source))]
+                    bucket[0] += price
+                    bucket[1] += 1
+                # Ticks for days already folded in are too late to use
+            self._mark.advance([row[0] for row in rows])
+            if len(rows) < batch_size:
+                return
+
+    def _advance(self, through):
+        """Fold every pending day up to and including ``through``."""
+        if self._day is None:
+            complete = [day for day in self._pending if day <= through]
+            if not complete:
+                return
+            self._day = min(complete) - timedelta(days=1)
+
+        day = self._day + timedelta(days=1)
+        while day <= through:
+            observed = np.full(len(self._keys), np.nan)
+            for row, (total, count) in self._pending.pop(day, {}).items():
+                observed[row] = total / count
+            self._step(day, observed)
+            day += timedelta(days=1)
+
+    @property
+    def ready(self):
+        """Whether the state has caught up with market_data at least once."""
+        return self._warmed
+
+    @property
+    def day(self):
+        """Last day folded into the state, or None without history."""
+        return self._day
+
+    def warm_in_background(self, app):
+        """Start catching up with market_data in a thread unless already warm."""
+        with self._warmer_lock:
+            if self._warmed or (self._warmer is not None and self._warmer.is_alive()):
+                return
+            self._warmer = threading.Thread(
+                target=self._warm, args=(app,), name="forecast-warm", daemon=True)
+            self._warmer.start()
+
+    def _warm(self, app):
+        """Background warm-up: load the state file, then fold in what's new."""
+        with app.app_context():
+            try:
+                self.refresh(force=True)
+            except Exception:
+                logger.exception("Warming the price forecaster failed")
+
+    def refresh(self, force=False):
+        """
+        Bring the cached state up to date with market_data.
+
+        Only days before today are folded in, since today's prices are
+        still arriving. Calls within ``refresh_interval`` of the previous
+        one return immediately unless ``force`` is set.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = now
+            previous = (self._mark.value, self._day)
+            self._ingest()
+            self._advance(datetime.utcnow().date() - timedelta(days=1))
+            self._warmed = True
+            if (self._mark.value, self._day) != previous:
+                self._save()
+
+    def forecast(self, horizon, crop_type=None, market=None):
+        """
+        Forecast daily prices for matching series.
+
+        Args:
+            horizon (int): Number of days ahead to forecast.
+            crop_type (str): Restrict to one crop (optional).
+            market (str): Restrict to one market/source (optional).
+
+        Returns:
+            list: Dicts with crop_type, market and a list of
+            {"date", "price"} points starting the day after the state.
+        """
+        with self._lock:
+            rows = [row for row, (crop, source) in enumerate(self._keys)
+                    if (crop_type is None or crop == crop_type)
+                    and (market is None or source == market)
+                    and not np.isnan(self._level[row])]
+            if not rows:
+                return []
+
+            steps = np.arange(1, horizon + 1)
+            damping = np.cumsum(self.phi ** steps)
+            slots = (self._day.toordinal() + steps) % self.period
+            rows = np.array(rows)
+            values = (self._level[rows, None]
+                      + self._trend[rows, None] * damping[None, :]
+                      + self._season[rows][:, slots])
+            values = np.maximum(values, 0.0)
+            dates = [(self._day + timedelta(days=int(step))).isoformat()
+                     for step in steps]
+
+            return [{
+                "crop_type": self._keys[row][0],
+                "market": self._keys[row][1],
+                "forecast": [{"date": day, "price": round(float(price), 2)}
+                             for day, price in zip(dates, series)],
+            } for row, series in zip(rows, values)]
+
+    def next_price(self, crop_type):
+        """Return the next-day forecast averaged over a crop's markets."""
+        series = self.forecast(1, crop_type=crop_type)
+        if not series:
+            return None
+        return sum(s["forecast"][0]["price"] for s in series) / len(series)
+
+    def _save(self):
+        """Persist the fitted state so restarts don't refit from history."""
+        if not self.state_path or self._day is None:
+            return
+        tmp_path = self.state_path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            keys=np.array(json.dumps(self._keys)),
+            level=self._level, trend=self._trend, season=self._season,
+            meta=np.array([self._day.toordinal(), self._mark.value, self.period]),
+            pending=np.array(json.dumps([
+                [day.toordinal(), row, total, count]
+                for day, buckets in self._pending.items()
+                for row, (total, count) in buckets.items()])),
+        )
+        os.replace(tmp_path, self.state_path)
+
+    def _load(self):
+        """Restore state written by ``_save`` if it matches this model."""
+        self._loaded = True
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        with np.load(self.state_path) as state:
+            day, high_water, period = (int(v) for v in state["meta"])
+            if period != self.period:
+                return  # Season length changed; refit from history
+            self._keys = [tuple(key) for key in json.loads(str(state["keys"]))]
+            self._index = {key: row for row, key in enumerate(self._keys)}
+            self._level = state["level"]
+            self._trend = state["trend"]
+            self._season = state["season"]
+            self._day = date.fromordinal(day)
+            self._mark.reset(high_water)
+            for ordinal, row, total, count in json.loads(str(state["pending"])):
+                self._pending[date.fromordinal(ordinal)][row] = [total, count]
+
+
+_forecaster = None
+_forecaster_lock = threading.Lock()
+
+
+def get_price_forecaster(app):
+    """Return this process's forecaster, configured from the app on first use."""
+    global _forecaster
+    with _forecaster_lock:
+        if _forecaster is None:
+            config = app.config
+            _forecaster = PriceForecaster(
+                alpha=config["FORECAST_ALPHA"],
+                beta=config["FORECAST_BETA"],
+                gamma=config["FORECAST_GAMMA"],
+                phi=config["FORECAST_DAMPING"],
+                period=config["FORECAST_SEASON_DAYS"],
+                state_path=config["FORECAST_STATE_PATH"],
+                refresh_interval=config["FORECAST_REFRESH_INTERVAL"],
+            )
+        return _forecaster
@@ -10,5 +10,11 @@ from .user import User
 from .record import Record
 from .prediction import Prediction 
 from .market_data import MarketData 
+from .price_sketch import PriceSketch
+from .tombstone import Tombstone
+from .alert_subscription import AlertSubscription
+from .disease_risk import DiseaseRisk
+from .revoked_token import RevokedToken
 
-__all__ = ["BaseModel", "User", "Record", "Prediction", "MarketData"]
+__all__ = ["BaseModel", "User", "Record", "Prediction", "MarketData", "PriceSketch", "Tombstone", "AlertSubscription",
+           "DiseaseRisk", "RevokedToken"]
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""
+Defines the AlertSubscription model for the Gaine Africa application.
+"""
+
+from .base_model import BaseModel
+from app import db
+
+
+class AlertSubscription(BaseModel):
+    """
+    A farmer's request to be alerted when a crop's price crosses a threshold.
+    """
+
+    __tablename__ = 'alert_subscriptions'
+    __table_args__ = (
+        db.Index('ix_alert_subscriptions_user', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    crop_type = db.Column(db.String(100), nullable=False)
+    market = db.Column(db.String(255))  # Matches MarketData.source; None = any market
+    direction = db.Column(db.String(5), nullable=False)  # "above" or "below"
+    threshold = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        """Convert subscription to dictionary."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "crop_type": self.crop_type,
+            "market": self.market,
+            "direction": self.direction,
+            "threshold": self.threshold,
+        }
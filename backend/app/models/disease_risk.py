@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+"""
+Defines the DiseaseRisk model for the Gaine Africa application.
+"""
+
+from .base_model import BaseModel
+from app import db
+
+
+class DiseaseRisk(BaseModel):
+    """
+    Latest crop disease risk score for a farmer, written by the nightly run.
+    """
+
+    __tablename__ = 'disease_risks'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'disease', name='uq_disease_risk_user'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    crop = db.Column(db.String(100), nullable=False)
+    disease = db.Column(db.String(50), nullable=False)  # e.g. "late_blight"
+    score = db.Column(db.Float, nullable=False)  # 0.0 (no risk) to 1.0
+    level = db.Column(db.String(10), nullable=False)  # "low", "moderate" or "high"
+    events = db.Column(db.Integer, nullable=False)  # Model-specific risk events in window
+    window_end = db.Column(db.Date, nullable=False)  # Last weather day scored
+
+    def to_dict(self):
+        """Convert risk score to dictionary."""
+        return {
+            "crop": self.crop,
+            "disease": self.disease,
+            "score": self.score,
+            "level": self.level,
+            "events": self.events,
+            "window_end": self.window_end.isoformat(),
+            "computed_at": self.updated_at.isoformat(),
+        }
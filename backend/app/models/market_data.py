@@ -13,6 +13,9 @@ class MarketData(BaseModel):
     """
 
     __tablename__ = 'market_data'
+    __table_args__ = (
+        db.Index('ix_market_data_crop_time', 'crop_type', 'data_timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     crop_type = db.Column(db.String(100), nullable=False)
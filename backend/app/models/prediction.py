@@ -7,6 +7,9 @@ from app import db
 
 class Prediction(BaseModel):
     __tablename__ = "predictions"
+    __table_args__ = (
+        db.Index("ix_predictions_user_updated", "user_id", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""
+Defines the PriceSketch model for the Gaine Africa application.
+"""
+
+from .base_model import BaseModel
+from app import db
+from app.sketches import QuantileSketch
+
+
+class PriceSketch(BaseModel):
+    """
+    Stores a serialized quantile sketch of prices for one crop and month.
+    """
+
+    __tablename__ = 'price_sketches'
+    __table_args__ = (
+        db.UniqueConstraint('crop_type', 'period', name='uq_price_sketch_period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    crop_type = db.Column(db.String(100), nullable=False)
+    period = db.Column(db.String(7), nullable=False)  # Month as "YYYY-MM"
+    count = db.Column(db.Integer, nullable=False, default=0)
+    digest = db.Column(db.LargeBinary, nullable=False)
+
+    @property
+    def sketch(self):
+        """Deserialize the stored digest."""
+        return QuantileSketch.from_bytes(self.digest)
+
+    @sketch.setter
+    def sketch(self, value):
+        """Serialize a sketch into the digest column."""
+        self.digest = value.to_bytes()
+        self.count = int(value.count)
@@ -13,6 +13,12 @@ class Record(BaseModel):
     """
 
     __tablename__ = 'records'
+    __table_args__ = (
+        db.Index('ix_records_user_updated', 'user_id', 'updated_at'),
+        db.Index('ix_records_user_created', 'user_id', 'created_at'),
+        db.Index('ix_records_user_profit', 'user_id', 'profit'),
+        db.Index('ix_records_user_crop_profit', 'user_id', 'crop', 'profit'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -26,6 +32,11 @@ class Record(BaseModel):
 
     sales = db.Column(db.Float, nullable=False, default=0.0)  # Total revenue from sales
 
+    # Stored copies of the derived totals so SQL can filter and sort on them;
+    # kept in sync by _store_totals on every ORM insert and update
+    total_cost = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    profit = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+
     @property
     def profit_or_loss(self):
         """Calculate profit/loss dynamically (not stored in DB)."""
@@ -42,9 +53,18 @@ class Record(BaseModel):
             "harvesting": self.harvesting,
             "storage": self.storage,
             "sales": self.sales,
-            "profit_or_loss": self.calculate_profit_or_loss()  # Include in output
+            "profit_or_loss": self.profit_or_loss  # Include in output
         }
 
     def save(self):
         """Save the record with calculated profit/loss (if needed)."""
         super().save()  # Call the parent class's save method
+
+
+@db.event.listens_for(Record, "before_insert")
+@db.event.listens_for(Record, "before_update")
+def _store_totals(mapper, connection, record):
+    """Recompute the stored total_cost and profit before the row is written."""
+    record.total_cost = ((record.planting or 0.0) + (record.weeding or 0.0)
+                         + (record.harvesting or 0.0) + (record.storage or 0.0))
+    record.profit = (record.sales or 0.0) - record.total_cost
@@ -0,0 +1,23 @@
+#!/usr/bin/python3
+"""
+Defines the RevokedToken model for the Gaine Africa application.
+"""
+
+from .base_model import BaseModel
+from app import db
+
+
+class RevokedToken(BaseModel):
+    """
+    A JWT that was revoked (e.g. by logout) before it expired.
+    """
+
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        db.Index('ix_revoked_tokens_expires', 'expires_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)  # JWT ID claim
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    expires_at = db.Column(db.DateTime)  # Token expiry; None if it never expires
@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+"""
+Defines the Tombstone model for the Gaine Africa application.
+"""
+
+from datetime import datetime
+from .base_model import BaseModel
+from app import db
+
+
+class Tombstone(BaseModel):
+    """
+    Marks a deleted row so offline clients can remove their local copy.
+    """
+
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_user_deleted', 'user_id', 'deleted_at'),
+        db.Index('ix_tombstones_deleted', 'deleted_at'),  # Retention pruning
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    resource = db.Column(db.String(20), nullable=False)  # e.g. "record"
+    resource_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""
+Id high-water marks that tolerate out-of-order commits.
+
+Polling ``id > last seen id`` misses rows on databases that hand out
+auto-increment ids at insert time but make them visible at commit: a
+transaction holding id 41 can commit after one holding id 42, and a
+poller that already moved to 42 never sees 41. HighWaterMark remembers
+the ids it skipped over as gaps and keeps asking for them alongside new
+rows for a grace period, after which a gap is taken to be a rolled-back
+or deleted row.
+"""
+import time
+
+from sqlalchemy import or_
+
+
+class HighWaterMark:
+    """
+    Tracks the highest id polled so far plus the recent gaps below it.
+
+    Attributes:
+        value (int): Highest id seen, or None before the first poll.
+        grace (float): Seconds a gap is re-checked before it is dropped.
+        max_gaps (int): Most gaps tracked; the oldest ids drop first.
+    """
+
+    def __init__(self, grace=60.0, max_gaps=1000):
+        self.value = None
+        self.grace = grace
+        self.max_gaps = max_gaps
+        self._gaps = {}  # Skipped id -> monotonic deadline
+
+    @property
+    def gaps(self):
+        return sorted(self._gaps)
+
+    def reset(self, value):
+        """Start over from ``value`` with no gaps, e.g. to skip idle time."""
+        self.value = value
+        self._gaps.clear()
+
+    def criterion(self, column):
+        """SQL filter on ``column`` for rows past the mark or in a gap."""
+        newer = column > self.value
+        if not self._gaps:
+            return newer
+        return or_(newer, column.in_(self.gaps))
+
+    def advance(self, ids):
+        """
+        Record the ids a poll returned.
+
+        Ids returned from a gap close it, and ids the mark jumped over
+        open new gaps. Call this after each poll, even with no rows, so
+        expired gaps are dropped.
+        """
+        now = time.monotonic()
+        for gap, deadline in list(self._gaps.items()):
+            if deadline <= now:
+                del self._gaps[gap]
+        seen = set(ids)
+        for row_id in seen:
+            self._gaps.pop(row_id, None)
+
+        top = max(seen, default=self.value)
+        if top > self.value:
+            deadline = now + self.grace
+            start = max(self.value + 1, top - self.max_gaps)
+            for row_id in range(start, top):
+                if row_id not in seen:
+                    self._gaps[row_id] = deadline
+            self.value = top
+        if len(self._gaps) > self.max_gaps:
+            for gap in self.gaps[:len(self._gaps) - self.max_gaps]:
+                del self._gaps[gap]
@@ -0,0 +1,232 @@
+#!/usr/bin/python3
+"""
+On-demand sampling profiler for production requests.
+
+Profiling is only wired into the app when PROFILER_TOKEN is configured,
+so a deployment without it pays nothing. With a token, a request is
+profiled when:
+
+- it carries ``X-Profile: <token>``, or
+- an admin armed the profiler through /api/admin/profiler for its
+  endpoint, and it falls within the configured sample rate.
+
+A single sampler thread walks the stacks of the profiled request threads
+every PROFILER_INTERVAL seconds. Each finished profile is written to
+PROFILER_DIR in collapsed-stack format (one "frame;frame;frame count"
+line per stack), which flamegraph.pl and speedscope read directly, and
+the request's CPU and wall time are reported in a Server-Timing header.
+Batched reads that run on worker threads are sampled into the batch's
+profile while they run.
+"""
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import request
+
+from app.admission import SUBREQUEST_KEY
+
+PROFILE_KEY = "gaine.profile"
+PARENT_PROFILE_KEY = "gaine.parent_profile"  # Set on batch sub-requests
+ATTACHED_KEY = "gaine.profile_attached"
+
+
+class RequestProfile:
+    """Samples and timings collected for one request."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.helper_cpu = 0.0  # Seconds of CPU used on attached threads
+        self.wall_ms = self.cpu_ms = None
+
+    def finish(self):
+        """Record wall and CPU time; must run on the request thread."""
+        self.wall_ms = (time.perf_counter() - self.wall_start) * 1000
+        self.cpu_ms = (time.thread_time() - self.cpu_start + self.helper_cpu) * 1000
+
+
+def _collapse(frame):
+    """Render a frame chain root-first in collapsed-stack notation."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Process-wide sampler shared by all profiled requests.
+
+    The sampler thread only runs while at least one request is being
+    profiled and exits once none remain.
+    """
+
+    def __init__(self, token, output_dir, interval=0.005):
+        self.token = token
+        self.output_dir = output_dir
+        self.interval = interval
+        self.endpoints = set()  # Armed endpoints; empty set means all
+        self.sample_rate = 0.0
+        self.armed_until = 0.0
+        self._active = {}  # Sampled thread id -> profile
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def authorized(self, value):
+        """Constant-time check of an admin-supplied token."""
+        # compare_digest rejects non-ASCII str, so compare encoded bytes
+        return bool(value) and hmac.compare_digest(
+            value.encode("utf-8"), self.token.encode("utf-8"))
+
+    def arm(self, endpoints, sample_rate, duration):
+        """Profile a share of requests to ``endpoints`` for ``duration`` seconds."""
+        self.endpoints = set(endpoints or ())
+        self.sample_rate = sample_rate
+        self.armed_until = time.monotonic() + duration
+
+    def disarm(self):
+        """Stop sampling new requests; in-progress profiles still finish."""
+        self.sample_rate = 0.0
+        self.armed_until = 0.0
+
+    def status(self):
+        """Describe the current arming state."""
+        remaining = max(0.0, self.armed_until - time.monotonic())
+        return {
+            "armed": remaining > 0 and self.sample_rate > 0,
+            "endpoints": sorted(self.endpoints),
+            "sample_rate": self.sample_rate,
+            "seconds_remaining": round(remaining, 1),
+            "active_profiles": len(self._active),
+        }
+
+    def should_profile(self, endpoint, header):
+        """Decide whether the current request gets profiled."""
+        if header is not None:
+            return self.authorized(header)
+        if not self.sample_rate or time.monotonic() > self.armed_until:
+            return False
+        if self.endpoints and endpoint not in self.endpoints:
+            return False
+        return random.random() < self.sample_rate
+
+    def start(self, endpoint):
+        """Begin profiling the calling request thread."""
+        profile = RequestProfile(endpoint)
+        with self._lock:
+            self._active[profile.thread_id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def attach(self, profile):
+        """
+        Sample the calling worker thread into ``profile`` until detached.
+
+        Returns:
+            float: The thread's CPU time now, to pass to detach.
+        """
+        with self._lock:
+            if profile.thread_id in self._active:  # Not stopped yet
+                self._active[threading.get_ident()] = profile
+        return time.thread_time()
+
+    def detach(self, profile, cpu_start):
+        """Stop sampling the calling worker thread and charge its CPU time."""
+        with self._lock:
+            if self._active.get(threading.get_ident()) is profile:
+                del self._active[threading.get_ident()]
+            profile.helper_cpu += time.thread_time() - cpu_start
+
+    def stop(self, profile):
+        """Stop sampling a request and write its collapsed stacks."""
+        with self._lock:
+            for thread_id in [thread_id for thread_id, active in self._active.items()
+                              if active is profile]:
+                del self._active[thread_id]
+        profile.finish()
+        if not profile.stacks:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = "{}-{}-{}.folded".format(
+            profile.endpoint.replace(".", "_"),
+            time.strftime("%Y%m%dT%H%M%S"),
+            os.getpid(),
+        )
+        path = os.path.join(self.output_dir, name)
+        with open(path, "a") as output:
+            for stack, count in profile.stacks.items():
+                output.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self):
+        """Sampler loop: snapshot profiled threads' stacks every interval."""
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, profile in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.stacks[_collapse(frame)] += 1
+
+
+def init_profiler(app):
+    """Install the profiling hooks; call only when PROFILER_TOKEN is set."""
+    profiler = SamplingProfiler(
+        app.config["PROFILER_TOKEN"],
+        app.config["PROFILER_DIR"],
+        interval=app.config["PROFILER_INTERVAL"],
+    )
+    app.extensions["profiler"] = profiler
+
+    @app.before_request
+    def start_profile():
+        if request.endpoint is None:
+            return
+        if request.environ.get(SUBREQUEST_KEY):
+            # Writes share the batch's thread; reads on worker threads join its profile
+            parent = request.environ.get(PARENT_PROFILE_KEY)
+            if parent is not None and parent.thread_id != threading.get_ident():
+                request.environ[ATTACHED_KEY] = profiler.attach(parent)
+            return
+        if profiler.should_profile(request.endpoint, request.headers.get("X-Profile")):
+            request.environ[PROFILE_KEY] = profiler.start(request.endpoint)
+
+    @app.after_request
+    def report_profile(response):
+        profile = request.environ.pop(PROFILE_KEY, None)
+        if profile is not None:
+            path = profiler.stop(profile)
+            response.headers.add(
+                "Server-Timing",
+                f"cpu;dur={profile.cpu_ms:.1f}, wall;dur={profile.wall_ms:.1f}")
+            app.logger.info(
+                "Profiled %s: cpu=%.1fms wall=%.1fms -> %s",
+                profile.endpoint, profile.cpu_ms, profile.wall_ms, path)
+        return response
+
+    @app.teardown_request
+    def drop_profile(exc):
+        cpu_start = request.environ.pop(ATTACHED_KEY, None)
+        if cpu_start is not None:
+            profiler.detach(request.environ[PARENT_PROFILE_KEY], cpu_start)
+        # after_request is skipped when the view raised
+        profile = request.environ.pop(PROFILE_KEY, None)
+        if profile is not None:
+            profiler.stop(profile)
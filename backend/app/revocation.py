@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+"""
+JWT revocation backed by a database denylist and an in-memory Bloom filter.
+
+Revoked token ids (``jti``) are stored in the revoked_tokens table. Every
+``@jwt_required`` request checks its jti against a per-process Bloom
+filter built from that table: a miss means the token is definitely not
+revoked and costs a few hash probes, and only a hit (a revoked token or a
+rare false positive) is confirmed with a unique-index lookup.
+
+The filter picks up revocations made by other workers by polling for rows
+past its id high-water mark every REVOCATION_POLL_INTERVAL seconds,
+re-checking ids it skipped over in case they commit late. It is
+rebuilt from unexpired rows only every REVOCATION_REBUILD_INTERVAL seconds,
+or sooner once it fills up, so entries for tokens that have expired
+anyway drop out. ``flask prune-revoked-tokens`` deletes the expired rows.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db, jwt
+from app.auth import forget_verified_token, verified_by_batch
+from app.models import RevokedToken
+from app.polling import HighWaterMark
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(key))
+
+
+def _unexpired():
+    return or_(RevokedToken.expires_at.is_(None),
+               RevokedToken.expires_at > datetime.utcnow())
+
+
+class RevocationList:
+    """Process-local view of the revoked_tokens table."""
+
+    def __init__(self, error_rate=0.001, min_capacity=10000,
+                 poll_interval=5.0, rebuild_interval=3600.0, gap_grace=60.0):
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.poll_interval = poll_interval
+        self.rebuild_interval = rebuild_interval
+        self._filter = None
+        self._mark = HighWaterMark(grace=gap_grace)  # RevokedToken ids folded in
+        self._next_poll = 0.0
+        self._next_rebuild = 0.0
+        self._lock = threading.Lock()
+
+    def _rebuild(self, now):
+        """Replace the filter with one holding only unexpired entries."""
+        high_water = db.session.query(func.max(RevokedToken.id)).scalar() or 0
+        rows = (db.session.query(RevokedToken.id, RevokedToken.jti)
+                .filter(RevokedToken.id <= high_water, _unexpired())
+                .all())
+        bloom = BloomFilter(max(self.min_capacity, 2 * len(rows)), self.error_rate)
+        for _, jti in rows:
+            bloom.add(jti)
+        self._filter = bloom  # Readers see the old or new filter, never a partial one
+        if self._mark.value is None:
+            self._mark.reset(high_water)
+        else:  # Close gaps that committed since, open any new ones
+            self._mark.advance(row_id for row_id, _ in rows)
+        self._next_rebuild = now + self.rebuild_interval
+
+    def _poll(self):
+        """Fold in tokens revoked since the last poll, e.g. by other workers."""
+        rows = (db.session.query(RevokedToken.id, RevokedToken.jti)
+                .filter(self._mark.criterion(RevokedToken.id), _unexpired())
+                .all())
+        for _, jti in rows:
+            self._filter.add(jti)
+        self._mark.advance(row_id for row_id, _ in rows)
+
+    def refresh(self):
+        """Poll or rebuild the filter when due; cheap to call per request."""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        with self._lock:
+            if now < self._next_poll:
+                return
+            if (self._filter is None or now >= self._next_rebuild
+                    or self._filter.count >= self._filter.capacity):
+                self._rebuild(now)
+            else:
+                self._poll()
+            self._next_poll = now + self.poll_interval
+
+    def is_revoked(self, jti):
+        """True if ``jti`` was revoked; only filter hits reach the database."""
+        self.refresh()
+        if jti not in self._filter:
+            return False
+        return db.session.query(RevokedToken.id).filter_by(jti=jti).first() is not None
+
+    def revoke(self, jti, user_id=None, expires_at=None):
+        """
+        Persist a revocation and apply it to this process immediately.
+
+        Revoking a token twice, e.g. from two racing logouts, is a no-op.
+        """
+        try:
+            RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at).save()
+        except IntegrityError:
+            db.session.rollback()
+            if db.session.query(RevokedToken.id).filter_by(jti=jti).first() is None:
+                raise
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+
+def prune_revoked_tokens():
+    """
+    Delete denylist rows for tokens that have expired anyway.
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    removed = (RevokedToken.query
+               .filter(RevokedToken.expires_at <= datetime.utcnow())
+               .delete(synchronize_session=False))
+    db.session.commit()
+    return removed
+
+
+def revoke_token(payload):
+    """Revoke the token a decoded JWT ``payload`` came from."""
+    expires_at = datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else None
+    current_app.extensions["revocation"].revoke(
+        payload["jti"], user_id=payload.get("sub"), expires_at=expires_at)
+    forget_verified_token(payload["jti"])
+
+
+def _check_revoked(jwt_header, jwt_payload):
+    if verified_by_batch(jwt_payload):
+        return False  # Checked once for the whole batch
+    return current_app.extensions["revocation"].is_revoked(jwt_payload["jti"])
+
+
+def init_revocation(app):
+    """Attach the revocation list and install the JWT blocklist check."""
+    app.extensions["revocation"] = RevocationList(
+        error_rate=app.config["REVOCATION_FALSE_POSITIVE_RATE"],
+        min_capacity=app.config["REVOCATION_MIN_CAPACITY"],
+        poll_interval=app.config["REVOCATION_POLL_INTERVAL"],
+        rebuild_interval=app.config["REVOCATION_REBUILD_INTERVAL"],
+        gap_grace=app.config["REVOCATION_GAP_GRACE"],
+    )
+    jwt.token_in_blocklist_loader(_check_revoked)
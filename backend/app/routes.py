@@ -5,13 +5,38 @@ Gaine Africa API Routes Module
 Defines all RESTful endpoints for user management, agricultural record tracking,
 and crop prediction features. Implements JWT authentication and CORS security.
 """
+import math
+from datetime import datetime, timedelta
 from flask_cors import CORS
 from flask_cors import cross_origin
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
-from flask import Blueprint, jsonify, request, session, current_app
-from app.models import User, Record
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, create_access_token, verify_jwt_in_request
+from flask_jwt_extended.exceptions import RevokedTokenError
+from jwt import ExpiredSignatureError
+from flask import Blueprint, Response, jsonify, request, session, current_app
+from app.models import User, Record, AlertSubscription, DiseaseRisk
 from app import db
 from .models.prediction import Prediction
+from .alerts import ABOVE, BELOW, get_alert_engine
+from .batch import encode_results, run_batch
+from .cache import ALL_USERS, cached_json
+from .forecasting import get_price_forecaster
+from .revocation import revoke_token
+from .services import (
+    RecordFilterError,
+    SyncTokenError,
+    apply_client_changes,
+    changes_since,
+    decode_sync_token,
+    ingest_market_data,
+    is_sketch_period,
+    parse_record_filters,
+    price_distribution,
+    query_records,
+    record_filters_key,
+    record_tombstone,
+    sketch_period,
+)
+from .streaming import event_stream, market_feed
 from flask_bcrypt import Bcrypt
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -75,19 +100,26 @@ Register new user with email uniqueness validation.
         - name: User's full name
         - email: Unique email address
         - password: Login credential
+        - phone, age, location, land_size, crop: Farm profile
         
     Returns:
         JSON: Success/error message
         Status:
             - 201: User created successfully
-            - 400: Missing required fields
+            - 400: Missing required fields or invalid age/land size
             - 409: Email already registered
     """
     data = request.get_json()
 
-    # Validate required fields
-    if not all(key in data for key in ['name', 'email', 'password']):
+    # Validate required fields (every profile column is NOT NULL)
+    required_fields = ['name', 'email', 'password', 'phone', 'age', 'location', 'land_size', 'crop']
+    if not data or not all(key in data for key in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
+    try:
+        age = int(data['age'])
+        land_size = float(data['land_size'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid age or land size format'}), 400
     
     # Check for existing email
     existing_user = User.query.filter_by(email=data['email']).first()
@@ -95,7 +127,9 @@ Register new user with email uniqueness validation.
         return jsonify({'error': 'Email already in use'}), 409
     
     # Create and persist new user
-    new_user = User(name=data['name'], email=data['email'])
+    new_user = User(name=data['name'], email=data['email'], phone=data['phone'],
+                    age=age, location=data['location'], land_size=land_size,
+                    crop=data['crop'])
     new_user.set_password(data['password'])
     db.session.add(new_user)
     db.session.commit()
@@ -143,14 +177,22 @@ def login():
 @main_routes.route('/api/logout', methods=['POST'])
 def logout():
     """
-    Logs out a user by clearing the session data.
+    Logs out a user by clearing the session data and revoking the
+    bearer token, if one was sent, so it can't be reused. Logging out
+    with a token that is already revoked or expired succeeds too.
 
     Returns:
         JSON: Success message
         Status:
             - 200: Logout successful
+            - 422: Token malformed or not signed by this server
     """
     session.pop('user_id', None)
+    try:
+        if verify_jwt_in_request(optional=True):
+            revoke_token(get_jwt())
+    except (ExpiredSignatureError, RevokedTokenError):
+        pass  # The token can't be used any more anyway
     return jsonify({'message': 'Logout successful'}), 200
 
 @main_routes.route('/api/users/<int:user_id>/records', methods=['GET'])
@@ -161,33 +203,50 @@ def get_records(user_id):
     
     Args:
         user_id (int): Target user ID from URL path
+
+    Query Parameters (all optional):
+        - crop: Only records for this crop
+        - from: First creation date "YYYY-MM-DD" (inclusive)
+        - to: Last creation date "YYYY-MM-DD" (inclusive)
+        - min_profit: Lowest profit/loss to include (negative for losses)
+        - max_profit: Highest profit/loss to include (e.g. 0 for losses only)
+        - order_by: "profit", "-profit", "created_at" or "-created_at"
+        - limit: Maximum number of records returned
+
+    Any other query parameter is rejected, so a misspelt filter fails
+    instead of silently returning unfiltered records.
         
     Returns:
         JSON: List of farming records with calculated profits
         Status:
             - 200: Successful retrieval (empty array if no records)
+            - 400: Invalid or unknown query parameter
             - 401: Missing/invalid JWT
     """
-    records = Record.query.filter_by(user_id=user_id).all()
+    try:
+        filters = parse_record_filters(request.args, current_app.config['RECORDS_MAX_LIMIT'])
+    except RecordFilterError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    def build():
+        records = query_records(user_id, filters).all()
+        return [
+            {
+                'id': record.id,
+                'crop': record.crop,
+                'planting': record.planting,
+                'weeding': record.weeding,
+                'harvesting': record.harvesting,
+                'storage': record.storage,
+                'sales': record.sales,
+                'profit_or_loss': record.profit_or_loss  # Auto-computed
+            }
+            for record in records
+        ]
 
-    if not records:
-        
-        # Return empty list instead of 404
-        return jsonify([]), 200
-
-    return jsonify([
-        {
-            'id': record.id,
-            'crop': record.crop,
-            'planting': record.planting,
-            'weeding': record.weeding,
-            'harvesting': record.harvesting,
-            'storage': record.storage,
-            'sales': record.sales,
-            'profit_or_loss': record.calculate_profit_or_loss()  # Auto-computed
-        }
-        for record in records
-    ]), 200
+    # Empty list instead of 404 when the user has no records
+    payload = cached_json(user_id, 'records', record_filters_key(filters), build)
+    return Response(payload, mimetype='application/json'), 200
 
 @main_routes.route('/api/users/<int:user_id>/records', methods=['POST'])
 @cross_origin(origin='http://localhost:5173', supports_credentials=True)
@@ -330,6 +389,7 @@ def delete_record(user_id, record_id):
         return jsonify({'error': 'Record not found'}), 404
 
     db.session.delete(record)
+    record_tombstone(user_id, 'record', record.id)  # Let offline clients drop it
     db.session.commit()
 
     return jsonify({'message': 'Record deleted successfully'}), 200
@@ -348,11 +408,17 @@ def get_user(user_id):
             - 200: User found
             - 404: User not found
     """
-    user = User.query.get(user_id)
-    if not user:
+    def build():
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        return {'id': user.id, 'name': user.name, 'email': user.email}
+
+    payload = cached_json(user_id, 'user', '', build)
+    if payload == b'null':
         return jsonify({'error': 'User not found'}), 404
 
-    return jsonify({'id': user.id, 'name': user.name, 'email': user.email})
+    return Response(payload, mimetype='application/json')
 
 @main_routes.route('/api/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -434,8 +500,9 @@ def get_predictions():
         Status:
             - 200: Always successful (empty array if no predictions)
     """
-    predictions = Prediction.query.all()
-    return jsonify([prediction.to_dict() for prediction in predictions])
+    payload = cached_json(ALL_USERS, 'predictions', '',
+                          lambda: [prediction.to_dict() for prediction in Prediction.query.all()])
+    return Response(payload, mimetype='application/json')
 
 @main_routes.route('/api/predictions', methods=['POST'])
 def add_prediction():
@@ -446,28 +513,482 @@ def add_prediction():
         - user_id: Associated farmer ID
         - crop: Predicted crop type
         - yield_estimate: Projected yield in kilograms
-        - market_price: Anticipated price per unit
+        - market_price: Anticipated price per unit (optional; defaults to
+          the server's next-day price forecast for the crop)
         
     Returns:
         JSON: Success/error message
         Status:
             - 201: Prediction stored
-            - 400: Missing required fields
+            - 400: Missing required fields or no forecast for the crop
+            - 503: Forecasts are still warming up (market_price omitted)
     
     """
     data = request.get_json()
 
-    if not all(key in data for key in ['user_id', 'crop', 'yield_estimate', 'market_price']):
+    if not all(key in data for key in ['user_id', 'crop', 'yield_estimate']):
         return jsonify({'error': 'Missing required fields'}), 400
 
+    market_price = data.get('market_price')
+    if market_price is None:
+        forecaster = _ready_forecaster()
+        if forecaster is None:
+            return _forecasts_warming()
+        market_price = forecaster.next_price(data['crop'])
+        if market_price is None:
+            return jsonify({'error': 'No market price history for this crop'}), 400
+
     new_prediction = Prediction(
         user_id=data['user_id'],
         crop=data['crop'],
         yield_estimate=data['yield_estimate'],
-        market_price=data['market_price']
+        market_price=market_price
     )
 
     db.session.add(new_prediction)
     db.session.commit()
 
-    return jsonify({'message': 'Prediction added successfully'}), 201
\ No newline at end of file
+    return jsonify({'message': 'Prediction added successfully'}), 201
+
+@main_routes.route('/api/market-data', methods=['POST'])
+@jwt_required()
+def add_market_data():
+    """
+    Ingest one or more market price ticks.
+
+    Expected JSON Payload (object or list of objects):
+        - crop_type: Crop the price applies to
+        - price: Observed price per unit
+        - source: Market or feed the price came from (optional)
+        - data_timestamp: ISO 8601 observation time (optional)
+
+    Returns:
+        JSON: Number of ticks stored
+        Status:
+            - 201: Ticks stored
+            - 400: Missing or invalid fields
+    """
+    data = request.get_json()
+    ticks = data if isinstance(data, list) else [data]
+
+    try:
+        for tick in ticks:
+            if not tick or 'crop_type' not in tick or 'price' not in tick:
+                return jsonify({'error': 'Missing required fields'}), 400
+            # NaN can't be stored and infinity would poison the month's sketch
+            if not math.isfinite(float(tick['price'])):
+                raise ValueError('price must be finite')
+            if tick.get('data_timestamp'):
+                tick['data_timestamp'] = datetime.fromisoformat(tick['data_timestamp'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid price or timestamp format'}), 400
+
+    rows = ingest_market_data(ticks)
+    return jsonify({'message': 'Market data stored', 'count': len(rows)}), 201
+
+@main_routes.route('/api/market-data/<crop_type>/percentiles', methods=['GET'])
+def get_price_percentiles(crop_type):
+    """
+    Summarize the price distribution for a crop from its stored sketches.
+
+    Query Parameters:
+        - from: First month "YYYY-MM" (default: current month)
+        - to: Last month "YYYY-MM" (default: same as from)
+        - price: Offered price to rank against the distribution (optional)
+
+    Returns:
+        JSON: Count, min/max, p10/p25/p50/p75/p90 and, when a price is
+        given, its percentile rank (0-100)
+        Status:
+            - 200: Summary returned
+            - 400: Invalid month or price
+            - 404: No prices recorded for the crop in the range
+    """
+    start = request.args.get('from', sketch_period(datetime.utcnow()))
+    end = request.args.get('to', start)
+    # Periods are compared as strings, so "2026-1" would match the wrong months
+    if not (is_sketch_period(start) and is_sketch_period(end)):
+        return jsonify({'error': 'Invalid month format, expected YYYY-MM'}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+
+    sketch = price_distribution(crop_type, start, end)
+    if sketch is None:
+        return jsonify({'error': 'No market data for this crop and period'}), 404
+
+    summary = {
+        'crop_type': crop_type,
+        'from': start,
+        'to': end,
+        'count': int(sketch.count),
+        'min': sketch.min,
+        'max': sketch.max,
+        'percentiles': {
+            f'p{q}': sketch.quantile(q / 100.0) for q in (10, 25, 50, 75, 90)
+        },
+    }
+
+    if 'price' in request.args:
+        try:
+            price = float(request.args['price'])
+            if not math.isfinite(price):
+                raise ValueError('price must be finite')
+        except ValueError:
+            return jsonify({'error': 'Invalid price format'}), 400
+        summary['price'] = price
+        summary['percentile_rank'] = round(sketch.rank(price) * 100, 2)
+
+    return jsonify(summary), 200
+
+@main_routes.route('/api/users/<int:user_id>/alerts', methods=['GET'])
+@jwt_required()
+def get_alerts(user_id):
+    """
+    List a user's price alert subscriptions.
+
+    Args:
+        user_id (int): User ID from URL path
+
+    Returns:
+        JSON: List of subscriptions
+        Status:
+            - 200: Success
+            - 403: Unauthorized access attempt
+    """
+    if get_jwt_identity() != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    subscriptions = AlertSubscription.query.filter_by(user_id=user_id).all()
+    return jsonify([subscription.to_dict() for subscription in subscriptions]), 200
+
+@main_routes.route('/api/users/<int:user_id>/alerts', methods=['POST'])
+@jwt_required()
+def create_alert(user_id):
+    """
+    Subscribe to an alert when a crop's price crosses a threshold.
+
+    Args:
+        user_id (int): User ID from URL path
+
+    Expected JSON Payload:
+        - crop_type: Crop to watch
+        - direction: "above" or "below"
+        - threshold: Price that triggers the alert when crossed
+        - market: Market to watch (optional, any market if omitted)
+
+    Returns:
+        JSON: Created subscription
+        Status:
+            - 201: Subscription created
+            - 400: Missing or invalid fields
+            - 403: Unauthorized access attempt
+    """
+    if get_jwt_identity() != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json() or {}
+    if not data.get('crop_type') or 'threshold' not in data:
+        return jsonify({'error': 'Missing required fields'}), 400
+    if data.get('direction') not in (ABOVE, BELOW):
+        return jsonify({'error': 'direction must be "above" or "below"'}), 400
+    try:
+        threshold = float(data['threshold'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid threshold'}), 400
+
+    subscription = AlertSubscription(
+        user_id=user_id,
+        crop_type=data['crop_type'],
+        market=data.get('market'),
+        direction=data['direction'],
+        threshold=threshold,
+    )
+    subscription.save()
+    get_alert_engine(current_app).subscribe(subscription)
+
+    return jsonify(subscription.to_dict()), 201
+
+@main_routes.route('/api/users/<int:user_id>/alerts/<int:alert_id>', methods=['DELETE'])
+@jwt_required()
+def delete_alert(user_id, alert_id):
+    """
+    Cancel a price alert subscription.
+
+    Args:
+        user_id (int): User ID from URL path
+        alert_id (int): Subscription ID from URL path
+
+    Returns:
+        JSON: Success/error message
+        Status:
+            - 200: Subscription removed
+            - 403: Unauthorized access attempt
+            - 404: Subscription not found
+    """
+    if get_jwt_identity() != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    subscription = AlertSubscription.query.filter_by(id=alert_id, user_id=user_id).first()
+    if not subscription:
+        return jsonify({'error': 'Alert not found'}), 404
+
+    db.session.delete(subscription)
+    db.session.commit()
+    get_alert_engine(current_app).unsubscribe(alert_id)
+
+    return jsonify({'message': 'Alert deleted successfully'}), 200
+
+@main_routes.route('/api/users/<int:user_id>/disease-risk', methods=['GET'])
+@jwt_required()
+def get_disease_risk(user_id):
+    """
+    Retrieve the latest crop disease risk scores for a user.
+
+    Scores are computed for all farmers by the nightly
+    ``flask disease-risk`` run from their location's weather and crop.
+
+    Args:
+        user_id (int): User ID from URL path
+
+    Returns:
+        JSON: List of risk scores, empty if the crop has no disease model
+        Status:
+            - 200: Success
+            - 403: Unauthorized access attempt
+    """
+    if get_jwt_identity() != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    risks = DiseaseRisk.query.filter_by(user_id=user_id).all()
+    return jsonify([risk.to_dict() for risk in risks]), 200
+
+@main_routes.route('/api/market-data/stream', methods=['GET'])
+def stream_market_data():
+    """
+    Subscribe to live market price updates as Server-Sent Events.
+
+    Query Parameters:
+        - crops: Comma-separated crop types to follow (default: all crops)
+
+    Returns:
+        text/event-stream: "price" events for each new MarketData row,
+        periodic keepalive comments, and a "resync" event if the client
+        falls too far behind
+        Status:
+            - 200: Stream opened
+    """
+    crops = request.args.get('crops')
+    crops = {crop.strip() for crop in crops.split(',') if crop.strip()} if crops else None
+
+    app = current_app._get_current_object()
+    subscription = market_feed.subscribe(app, crops)
+    stream = event_stream(
+        market_feed,
+        subscription,
+        heartbeat=app.config['MARKET_FEED_HEARTBEAT'],
+        max_dropped=app.config['MARKET_FEED_MAX_DROPPED'],
+    )
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Stop nginx from buffering the stream
+    })
+
+@main_routes.route('/api/batch', methods=['POST'])
+def batch():
+    """
+    Execute several API calls in one round trip.
+
+    Expected JSON Payload:
+        - requests: List of sub-requests, each with
+            - method: HTTP method (default GET)
+            - path: API path including any query string
+            - body: JSON body for POST/PUT (optional)
+
+    The caller's Authorization header applies to every sub-request and is
+    validated once before any of them run.
+
+    Returns:
+        JSON: {"responses": [{"status", "body"}, ...]} in request order,
+        gzip-compressed when the client accepts it
+        Status:
+            - 200: Batch executed (check each sub-response status)
+            - 400: Malformed batch
+            - 413: Too many sub-requests
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('requests'), list):
+        return jsonify({'error': 'Expected a list of requests'}), 400
+    if len(data['requests']) > current_app.config['BATCH_MAX_REQUESTS']:
+        return jsonify({'error': 'Too many requests in batch'}), 413
+
+    # Reject a bad token once instead of once per sub-request
+    verify_jwt_in_request(optional=True)
+
+    headers = {}
+    if 'Authorization' in request.headers:
+        headers['Authorization'] = request.headers['Authorization']
+
+    app = current_app._get_current_object()
+    results = run_batch(app, data['requests'], headers,
+                        max_workers=app.config['BATCH_MAX_WORKERS'])
+    payload, extra_headers = encode_results(results, request.headers.get('Accept-Encoding'))
+    return Response(payload, mimetype='application/json', headers=extra_headers)
+
+def _sync_windows():
+    """Return the configured (overlap, retention) windows for delta sync."""
+    config = current_app.config
+    return (timedelta(seconds=config['SYNC_OVERLAP_SECONDS']),
+            timedelta(days=config['SYNC_TOMBSTONE_RETENTION_DAYS']))
+
+@main_routes.route('/api/sync', methods=['GET'])
+@jwt_required()
+def pull_changes():
+    """
+    Return the authenticated user's records and predictions changed since a token.
+
+    Query Parameters:
+        - token: Sync token from the previous sync (omit for a full snapshot)
+
+    Returns:
+        JSON: records, predictions, deleted ids by resource, a reset flag
+        (true when the client must replace its local copy) and the next token
+        Status:
+            - 200: Changes returned
+            - 400: Invalid sync token
+            - 401: Missing/invalid JWT
+    """
+    try:
+        since = decode_sync_token(request.args.get('token'))
+    except SyncTokenError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    return jsonify(changes_since(get_jwt_identity(), since, *_sync_windows())), 200
+
+@main_routes.route('/api/sync', methods=['POST'])
+@jwt_required()
+def push_changes():
+    """
+    Apply offline record edits, then return changes since the client's token.
+
+    Expected JSON Payload:
+        - token: Sync token from the previous sync
+        - changes: List of create/update/delete operations on records;
+          updates and deletes carry the base_updated_at they were made against
+
+    Returns:
+        JSON: created (client_id -> id), conflicts with the server copy,
+        and the same delta as GET /api/sync
+        Status:
+            - 200: Changes applied (check conflicts)
+            - 400: Invalid token or malformed change
+            - 401: Missing/invalid JWT
+    """
+    data = request.get_json(silent=True) or {}
+    user_id = get_jwt_identity()
+
+    try:
+        since = decode_sync_token(data.get('token'))
+        result = apply_client_changes(user_id, data.get('changes') or [])
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    result.update(changes_since(user_id, since, *_sync_windows()))
+    return jsonify(result), 200
+
+def _ready_forecaster():
+    """
+    Return the refreshed price forecaster, or None while it warms up.
+
+    A cold forecaster starts catching up with market_data in a background
+    thread instead of scanning the whole history inside this request.
+    """
+    forecaster = get_price_forecaster(current_app)
+    if not forecaster.ready:
+        forecaster.warm_in_background(current_app._get_current_object())
+        return None
+    forecaster.refresh()
+    return forecaster
+
+def _forecasts_warming():
+    """503 response for requests that arrive before the forecaster is warm."""
+    response = jsonify({'error': 'Price forecasts are warming up, try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+@main_routes.route('/api/forecast', methods=['GET'])
+def get_price_forecast():
+    """
+    Forecast daily market prices from the cached seasonal models.
+
+    Query Parameters:
+        - crop: Crop type to forecast (optional, default all crops)
+        - market: Market/source to forecast (optional, default all markets)
+        - horizon: Days ahead to forecast (default 14)
+
+    Returns:
+        JSON: List of series, each with crop_type, market and daily
+        {"date", "price"} points
+        Status:
+            - 200: Forecasts returned (empty list if no history)
+            - 400: Invalid horizon
+            - 503: Forecasts are still warming up; retry after Retry-After
+    """
+    max_horizon = current_app.config['FORECAST_MAX_HORIZON']
+    try:
+        horizon = int(request.args.get('horizon', 14))
+    except ValueError:
+        return jsonify({'error': 'Invalid horizon'}), 400
+    if not 1 <= horizon <= max_horizon:
+        return jsonify({'error': f'Horizon must be between 1 and {max_horizon} days'}), 400
+
+    forecaster = _ready_forecaster()
+    if forecaster is None:
+        return _forecasts_warming()
+    return jsonify(forecaster.forecast(
+        horizon,
+        crop_type=request.args.get('crop'),
+        market=request.args.get('market'),
+    )), 200
+
+@main_routes.route('/api/admin/profiler', methods=['GET', 'POST', 'DELETE'])
+def admin_profiler():
+    """
+    Inspect, arm or disarm the request sampling profiler.
+
+    Requires the X-Profiler-Token header to match PROFILER_TOKEN.
+
+    Expected JSON Payload (POST):
+        - endpoints: Endpoint names to sample, e.g. "main_routes.get_records"
+          (optional, default all)
+        - sample_rate: Share of matching requests to profile, 0-1
+        - duration: Seconds to stay armed (default 300)
+
+    Returns:
+        JSON: Profiler status
+        Status:
+            - 200: Status returned / profiler updated
+            - 400: Invalid sample rate or duration
+            - 403: Missing or wrong token
+            - 404: Profiler not enabled on this deployment
+    """
+    profiler = current_app.extensions.get('profiler')
+    if profiler is None:
+        return jsonify({'error': 'Profiler not enabled'}), 404
+    if not profiler.authorized(request.headers.get('X-Profiler-Token')):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            sample_rate = float(data.get('sample_rate', 0.01))
+            duration = float(data.get('duration', 300))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid sample rate or duration'}), 400
+        if not 0 < sample_rate <= 1 or duration <= 0:
+            return jsonify({'error': 'Invalid sample rate or duration'}), 400
+        profiler.arm(data.get('endpoints'), sample_rate, duration)
+    elif request.method == 'DELETE':
+        profiler.disarm()
+
+    return jsonify(profiler.status()), 200
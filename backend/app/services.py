@@ -0,0 +1,432 @@
+#!/usr/bin/python3
+"""
+Business logic shared by the Gaine Africa API routes.
+
+Keeps multi-model operations, such as ingesting market prices and the
+summaries derived from them, out of the request handlers.
+"""
+import base64
+import json
+import math
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.alerts import Tick, get_alert_engine
+from app.models import MarketData, Prediction, PriceSketch, Record, Tombstone
+from app.sketches import QuantileSketch
+from app.streaming import market_feed
+
+
+PERIOD_PATTERN = re.compile(r"\d{4}-(0[1-9]|1[0-2])")
+
+
+def sketch_period(timestamp):
+    """Return the "YYYY-MM" sketch period a timestamp falls into."""
+    return timestamp.strftime("%Y-%m")
+
+
+def is_sketch_period(value):
+    """True if ``value`` is a "YYYY-MM" month that sorts like one."""
+    return PERIOD_PATTERN.fullmatch(value) is not None
+
+
+def _lock_sketch(crop_type, period):
+    """
+    Load a sketch row for update, creating an empty one if it is missing.
+
+    SELECT ... FOR UPDATE can't lock a row that doesn't exist yet, so two
+    batches can both try to insert the same (crop, month). The insert runs
+    in a savepoint; the loser rolls back just that and, once the winner
+    has committed, locks the winner's row instead.
+    """
+    query = (PriceSketch.query
+             .filter_by(crop_type=crop_type, period=period)
+             .with_for_update())
+    stored = query.first()
+    if stored is not None:
+        return stored
+    try:
+        with db.session.begin_nested():
+            stored = PriceSketch(crop_type=crop_type, period=period)
+            stored.sketch = QuantileSketch()
+            db.session.add(stored)
+    except IntegrityError:
+        stored = query.one()
+    return stored
+
+
+def ingest_market_data(ticks):
+    """
+    Store a batch of market price ticks and fold them into price sketches.
+
+    Each (crop, month) sketch touched by the batch is loaded and written
+    back once, inside the same transaction as the new MarketData rows.
+    Sketches are locked in sorted order so concurrent batches can't
+    deadlock on each other.
+
+    Args:
+        ticks (list): Dicts with crop_type, price and optional source and
+            data_timestamp (datetime).
+
+    Returns:
+        list: The created MarketData instances.
+
+    Raises:
+        ValueError: If a price is not a finite number.
+    """
+    rows = []
+    grouped = defaultdict(list)
+    for tick in ticks:
+        price = float(tick["price"])
+        if not math.isfinite(price):
+            raise ValueError(f"Price must be finite, got {tick['price']!r}")
+        timestamp = tick.get("data_timestamp") or datetime.utcnow()
+        row = MarketData(
+            crop_type=tick["crop_type"],
+            price=price,
+            source=tick.get("source"),
+            data_timestamp=timestamp,
+        )
+        rows.append(row)
+        grouped[(row.crop_type, sketch_period(timestamp))].append(row.price)
+
+    db.session.add_all(rows)
+    for (crop_type, period), prices in sorted(grouped.items()):
+        stored = _lock_sketch(crop_type, period)
+        sketch = stored.sketch
+        for price in prices:
+            sketch.add(price)
+        stored.sketch = sketch
+    # Snapshot the rows for alert matching before commit expires them
+    db.session.flush()
+    ticks = [Tick(row.id, row.crop_type, row.source, row.price, row.data_timestamp)
+             for row in rows]
+    db.session.commit()
+    market_feed.notify()
+    get_alert_engine(current_app).process(ticks)  # Delivery happens off-request
+    return rows
+
+
+def price_distribution(crop_type, start, end):
+    """
+    Merge the stored sketches for a crop over a range of months.
+
+    Args:
+        crop_type (str): Crop to summarize.
+        start (str): First month, "YYYY-MM", inclusive.
+        end (str): Last month, "YYYY-MM", inclusive.
+
+    Returns:
+        QuantileSketch: Merged sketch, or None if no prices were recorded.
+    """
+    stored = (PriceSketch.query
+              .filter(PriceSketch.crop_type == crop_type,
+                      PriceSketch.period >= start,
+                      PriceSketch.period <= end)
+              .all())
+    if not stored:
+        return None
+    merged = QuantileSketch()
+    for row in stored:
+        merged.merge(row.sketch)
+    return merged
+
+
+def rebuild_price_sketches(batch_size=10000):
+    """
+    Recompute every price sketch from the raw market_data table.
+
+    Used once to backfill sketches for history ingested before sketches
+    existed; afterwards ingest_market_data keeps them current.
+
+    Returns:
+        int: Number of sketches written.
+    """
+    sketches = defaultdict(QuantileSketch)
+    last_id = 0
+    while True:
+        batch = (db.session.query(MarketData.id, MarketData.crop_type,
+                                  MarketData.price, MarketData.data_timestamp)
+                 .filter(MarketData.id > last_id)
+                 .order_by(MarketData.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        for row_id, crop_type, price, timestamp in batch:
+            timestamp = timestamp or datetime.utcnow()
+            sketches[(crop_type, sketch_period(timestamp))].add(price)
+        last_id = batch[-1][0]
+
+    PriceSketch.query.delete()
+    for (crop_type, period), sketch in sketches.items():
+        stored = PriceSketch(crop_type=crop_type, period=period)
+        stored.sketch = sketch
+        db.session.add(stored)
+    db.session.commit()
+    return len(sketches)
+
+
+# Cost and revenue columns a client may set on a record
+RECORD_AMOUNT_FIELDS = ("planting", "weeding", "harvesting", "storage", "sales")
+
+
+class SyncTokenError(ValueError):
+    """Raised when a client sends a sync token that cannot be decoded."""
+
+
+def encode_sync_token(since):
+    """Wrap a sync high-water timestamp in an opaque URL-safe token."""
+    raw = json.dumps({"t": since.isoformat()}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_sync_token(token):
+    """Return the timestamp inside a sync token, or None for a full sync."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token.encode("ascii"))
+        return datetime.fromisoformat(json.loads(raw)["t"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise SyncTokenError("Invalid sync token") from exc
+
+
+def record_tombstone(user_id, resource, resource_id):
+    """Queue a tombstone for a deleted row on the current session."""
+    db.session.add(Tombstone(user_id=user_id, resource=resource,
+                             resource_id=resource_id))
+
+
+def _sync_dict(instance):
+    """Serialize a synced row with an ISO updated_at for conflict checks."""
+    data = instance.to_dict()
+    data["updated_at"] = instance.updated_at.isoformat()
+    return data
+
+
+def changes_since(user_id, since, overlap, retention):
+    """
+    Collect a user's records, predictions and deletions since a token.
+
+    Rows are matched with ``updated_at >= since - overlap`` so writes that
+    committed just after the previous sync are not missed; clients apply
+    rows idempotently by id. A token older than the tombstone retention
+    window gets a full snapshot flagged with ``reset``.
+
+    Args:
+        user_id (int): Owner of the synced rows.
+        since (datetime): Timestamp from the client's token, or None.
+        overlap (timedelta): Safety margin re-sent on every sync.
+        retention (timedelta): How long tombstones are kept.
+
+    Returns:
+        dict: records, predictions, deleted ids, reset flag and new token.
+    """
+    now = datetime.utcnow()
+    reset = since is None or since < now - retention
+
+    records = Record.query.filter(Record.user_id == user_id)
+    predictions = Prediction.query.filter(Prediction.user_id == user_id)
+    deleted = {}
+    if not reset:
+        cutoff = since - overlap
+        records = records.filter(Record.updated_at >= cutoff)
+        predictions = predictions.filter(Prediction.updated_at >= cutoff)
+        tombstones = (db.session.query(Tombstone.resource, Tombstone.resource_id)
+                      .filter(Tombstone.user_id == user_id,
+                              Tombstone.deleted_at >= cutoff))
+        for resource, resource_id in tombstones:
+            deleted.setdefault(resource, []).append(resource_id)
+
+    return {
+        "reset": reset,
+        "records": [_sync_dict(record) for record in records],
+        "predictions": [_sync_dict(prediction) for prediction in predictions],
+        "deleted": deleted,
+        "token": encode_sync_token(now),
+    }
+
+
+def _apply_record_fields(record, data):
+    """Copy client-supplied record fields, validating the amounts."""
+    if "crop" in data:
+        record.crop = data["crop"]
+    for field in RECORD_AMOUNT_FIELDS:
+        if field in data:
+            setattr(record, field, float(data[field]))
+
+
+def apply_client_changes(user_id, changes):
+    """
+    Apply a batch of offline record edits with optimistic conflict checks.
+
+    Each change is one of:
+        - {"op": "create", "client_id": ..., "data": {...}}
+        - {"op": "update", "id": ..., "base_updated_at": ..., "data": {...}}
+        - {"op": "delete", "id": ..., "base_updated_at": ...}
+
+    An update or delete conflicts when the server row changed after the
+    client's ``base_updated_at`` or no longer exists; conflicting changes
+    are skipped and reported with the server's current copy. Everything
+    else is committed in a single transaction.
+
+    Raises:
+        ValueError: A change is malformed; nothing is committed.
+
+    Returns:
+        dict: client_id -> new record id for creates, and conflicts.
+    """
+    created = []
+    conflicts = []
+    try:
+        for change in changes:
+            op = change.get("op")
+            data = change.get("data") or {}
+            if op == "create":
+                record = Record(user_id=user_id, crop=data.get("crop"))
+                _apply_record_fields(record, data)
+                if not record.crop:
+                    raise ValueError("Created records need a crop")
+                db.session.add(record)
+                created.append((change.get("client_id"), record))
+                continue
+            if op not in ("update", "delete"):
+                raise ValueError(f"Unknown sync operation: {op}")
+
+            record = Record.query.filter_by(id=change.get("id"), user_id=user_id).first()
+            if record is None:
+                conflicts.append({"id": change.get("id"), "reason": "deleted"})
+                continue
+            base = change.get("base_updated_at")
+            if not base or record.updated_at > datetime.fromisoformat(base):
+                conflicts.append({"id": record.id, "reason": "modified",
+                                  "server": _sync_dict(record)})
+                continue
+            if op == "update":
+                _apply_record_fields(record, data)
+            else:
+                db.session.delete(record)
+                record_tombstone(user_id, "record", record.id)
+    except (AttributeError, TypeError, ValueError) as exc:
+        db.session.rollback()
+        raise ValueError(str(exc)) from exc
+
+    db.session.commit()
+    return {
+        "created": {client_id: record.id for client_id, record in created},
+        "conflicts": conflicts,
+    }
+
+
+def prune_tombstones(retention):
+    """Delete tombstones older than the retention window; return the count."""
+    cutoff = datetime.utcnow() - retention
+    removed = Tombstone.query.filter(Tombstone.deleted_at < cutoff).delete()
+    db.session.commit()
+    return removed
+
+
+RECORD_ORDERINGS = {
+    "profit": (Record.profit.asc(), Record.id.asc()),
+    "-profit": (Record.profit.desc(), Record.id.desc()),
+    "created_at": (Record.created_at.asc(), Record.id.asc()),
+    "-created_at": (Record.created_at.desc(), Record.id.desc()),
+}
+
+
+class RecordFilterError(ValueError):
+    """Raised when a record list query parameter is invalid."""
+
+
+RECORD_FILTER_PARAMS = ("crop", "from", "to", "min_profit", "max_profit", "limit", "order_by")
+
+
+def parse_record_filters(args, max_limit):
+    """
+    Validate record list query parameters into a normalized dict.
+
+    Args:
+        args (Mapping): Request query parameters.
+        max_limit (int): Largest page size a client may request.
+
+    Returns:
+        dict: Only the parameters that were given, with parsed values, so
+            equivalent query strings normalize to the same dict.
+
+    Raises:
+        RecordFilterError: If a parameter is malformed or unknown.
+    """
+    unknown = sorted(set(args) - set(RECORD_FILTER_PARAMS))
+    if unknown:
+        raise RecordFilterError(f"Unknown parameter {unknown[0]}; expected one of "
+                                f"{', '.join(RECORD_FILTER_PARAMS)}")
+    filters = {}
+    try:
+        if args.get("crop"):
+            filters["crop"] = args["crop"]
+        for name in ("from", "to"):
+            if args.get(name):
+                filters[name] = date.fromisoformat(args[name])
+        for name in ("min_profit", "max_profit"):
+            if args.get(name):
+                filters[name] = float(args[name])
+                if not math.isfinite(filters[name]):
+                    raise RecordFilterError(f"{name} must be a finite number")
+        if args.get("limit"):
+            filters["limit"] = int(args["limit"])
+            if not 0 < filters["limit"] <= max_limit:
+                raise RecordFilterError(f"limit must be between 1 and {max_limit}")
+    except ValueError as exc:
+        raise RecordFilterError(str(exc)) from exc
+    if args.get("order_by"):
+        if args["order_by"] not in RECORD_ORDERINGS:
+            raise RecordFilterError(
+                f"order_by must be one of {', '.join(RECORD_ORDERINGS)}")
+        filters["order_by"] = args["order_by"]
+    return filters
+
+
+def record_filters_key(filters):
+    """Stable cache variant for a normalized filter dict ("" if unfiltered)."""
+    return "&".join(f"{name}={filters[name]}" for name in sorted(filters))
+
+
+def query_records(user_id, filters):
+    """
+    Build the SQL query for a user's records with filters pushed down.
+
+    Every filter and ordering is served by an index leading with user_id:
+    ix_records_user_crop_profit, ix_records_user_profit or
+    ix_records_user_created.
+
+    Args:
+        user_id (int): Owner of the records.
+        filters (dict): Output of parse_record_filters.
+
+    Returns:
+        Query: Records matching the filters, in the requested order.
+    """
+    query = Record.query.filter(Record.user_id == user_id)
+    if "crop" in filters:
+        query = query.filter(Record.crop == filters["crop"])
+    if "from" in filters:
+        start = datetime.combine(filters["from"], datetime.min.time())
+        query = query.filter(Record.created_at >= start)
+    if "to" in filters:  # Inclusive of the whole day
+        end = datetime.combine(filters["to"] + timedelta(days=1), datetime.min.time())
+        query = query.filter(Record.created_at < end)
+    if "min_profit" in filters:
+        query = query.filter(Record.profit >= filters["min_profit"])
+    if "max_profit" in filters:
+        query = query.filter(Record.profit <= filters["max_profit"])
+    # Creation order by default, which ix_records_user_created serves without a sort
+    query = query.order_by(*RECORD_ORDERINGS[filters.get("order_by", "created_at")])
+    if "limit" in filters:
+        query = query.limit(filters["limit"])
+    return query
@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+"""
+Mergeable quantile sketches for market price distributions.
+
+A QuantileSketch is a small merging t-digest: prices are folded into a
+bounded number of weighted centroids, dense near the tails so that
+questions like "is this price in the bottom 10%?" stay accurate. Sketches
+for different time windows can be merged, and serialize to a compact
+binary blob for storage alongside the crop they describe.
+"""
+import struct
+from bisect import bisect_left
+
+# Header: compression, total weight, min, max, centroid count
+_HEADER = struct.Struct("<ddddI")
+_CENTROID = struct.Struct("<dd")
+
+
+class QuantileSketch:
+    """
+    Approximate, mergeable summary of a stream of prices.
+
+    Attributes:
+        compression (float): Accuracy/size trade-off; the sketch keeps a
+            few times ``compression`` centroids, growing only with the
+            log of the input size.
+        count (float): Total number of prices summarized.
+        min (float): Smallest price seen.
+        max (float): Largest price seen.
+    """
+
+    def __init__(self, compression=100.0):
+        self.compression = float(compression)
+        self.count = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._means = []
+        self._weights = []
+        self._buffer = []
+
+    def add(self, value, weight=1.0):
+        """Add a single price to the sketch."""
+        value = float(value)
+        self._buffer.append((value, float(weight)))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one and return self."""
+        other._compress()
+        self._buffer.extend(zip(other._means, other._weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        """Merge buffered points into centroids bounded by the k-size rule."""
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self._means, self._weights)) + self._buffer)
+        self._buffer = []
+        means, weights = [], []
+        total = self.count
+        cumulative = 0.0
+        mean, weight = points[0]
+        for next_mean, next_weight in points[1:]:
+            proposed = weight + next_weight
+            q = (cumulative + proposed / 2.0) / total
+            limit = 4.0 * total * q * (1.0 - q) / self.compression
+            if proposed <= max(limit, 1.0):
+                mean += (next_mean - mean) * next_weight / proposed
+                weight = proposed
+            else:
+                means.append(mean)
+                weights.append(weight)
+                cumulative += weight
+                mean, weight = next_mean, next_weight
+        means.append(mean)
+        weights.append(weight)
+        self._means, self._weights = means, weights
+
+    def quantile(self, q):
+        """
+        Estimate the price at quantile ``q``.
+
+        Args:
+            q (float): Quantile in the range [0, 1].
+
+        Returns:
+            float: Estimated price, or None for an empty sketch.
+        """
+        self._compress()
+        if not self._means:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        target = q * self.count
+        cumulative = 0.0
+        prev_mean, prev_mid = self.min, 0.0
+        for mean, weight in zip(self._means, self._weights):
+            mid = cumulative + weight / 2.0
+            if target < mid:
+                span = mid - prev_mid
+                frac = (target - prev_mid) / span if span else 0.0
+                return prev_mean + frac * (mean - prev_mean)
+            cumulative += weight
+            prev_mean, prev_mid = mean, mid
+        span = self.count - prev_mid
+        frac = (target - prev_mid) / span if span else 0.0
+        return prev_mean + frac * (self.max - prev_mean)
+
+    def rank(self, value):
+        """
+        Estimate the fraction of prices at or below ``value``.
+
+        Args:
+            value (float): Price to rank.
+
+        Returns:
+            float: Percentile rank in the range [0, 1], or None if empty.
+        """
+        self._compress()
+        if not self._means:
+            return None
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        index = bisect_left(self._means, value)
+        below = sum(self._weights[:index])
+        if index == 0:
+            left_mean, left_mid = self.min, 0.0
+        else:
+            left_mean = self._means[index - 1]
+            left_mid = below - self._weights[index - 1] / 2.0
+        if index == len(self._means):
+            right_mean, right_mid = self.max, self.count
+        else:
+            right_mean = self._means[index]
+            right_mid = below + self._weights[index] / 2.0
+        span = right_mean - left_mean
+        frac = (value - left_mean) / span if span else 1.0
+        return (left_mid + frac * (right_mid - left_mid)) / self.count
+
+    def to_bytes(self):
+        """Serialize the sketch to a compact binary blob."""
+        self._compress()
+        parts = [_HEADER.pack(self.compression, self.count, self.min,
+                              self.max, len(self._means))]
+        parts.extend(_CENTROID.pack(m, w)
+                     for m, w in zip(self._means, self._weights))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Rebuild a sketch from the output of ``to_bytes``."""
+        compression, count, low, high, size = _HEADER.unpack_from(blob)
+        sketch = cls(compression)
+        sketch.count, sketch.min, sketch.max = count, low, high
+        for i in range(size):
+            mean, weight = _CENTROID.unpack_from(
+                blob, _HEADER.size + i * _CENTROID.size)
+            sketch._means.append(mean)
+            sketch._weights.append(weight)
+        return sketch
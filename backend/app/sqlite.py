@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""
+SQLite edge deployment support.
+
+Cooperatives running the backend on a single small box can point
+DATABASE_URI at a SQLite file instead of MySQL. This module tunes every
+new connection with the configured pragmas (WAL journaling, busy
+timeout, synchronous level, page cache and mmap sizes) and funnels all
+writes in the process through one writer lock: a session takes the lock
+when it first writes and releases it when its transaction ends. Reads never
+take the lock, and with WAL they run in parallel with the single writer.
+
+Tables are declared AUTOINCREMENT so SQLite never hands out the id of a
+deleted row again; sync tombstones and the id high-water marks in
+revocation.py and streaming.py rely on ids never being reused.
+"""
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from app import db
+
+WRITER_KEY = "sqlite_writer"  # session.info entry naming the queue whose lock it holds
+
+
+class WriterQueue:
+    """Serializes write transactions from all threads of the process."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def acquire(self, session):
+        """Block until ``session`` may write; re-entrant per session."""
+        if session.info.get(WRITER_KEY) is self:
+            return
+        if not self._lock.acquire(timeout=self.timeout):
+            raise TimeoutError("Timed out waiting for the SQLite writer")
+        session.info[WRITER_KEY] = self
+
+    def release(self, session):
+        """Let the next writer in once ``session``'s transaction ends."""
+        if session.info.get(WRITER_KEY) is self:
+            del session.info[WRITER_KEY]
+            self._lock.release()
+
+
+def _writers():
+    """The current app's writer queue, or None outside SQLite mode."""
+    return current_app.extensions.get("sqlite_writer") if has_app_context() else None
+
+
+# db.session is shared by every app in the process, so these hooks are
+# registered once here and find the writer queue through current_app
+
+@event.listens_for(db.session, "before_flush")
+def _take_writer(session, flush_context, instances):
+    writers = _writers()
+    if writers is not None:
+        writers.acquire(session)
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _take_writer_for_bulk(orm_execute_state):
+    # Query.update()/delete() and bulk inserts bypass flush
+    writers = _writers()
+    if writers is not None and (orm_execute_state.is_update or orm_execute_state.is_delete
+                                or orm_execute_state.is_insert):
+        writers.acquire(orm_execute_state.session)
+
+
+@event.listens_for(db.session, "after_transaction_end")
+def _release_writer(session, transaction):
+    # Fires on commit, rollback and close; only the outermost counts
+    writers = session.info.get(WRITER_KEY)
+    if writers is not None and transaction.parent is None:
+        writers.release(session)
+
+
+def init_sqlite(app):
+    """Apply pragmas, AUTOINCREMENT and the single-writer queue to a SQLite-backed app."""
+    from app import models  # noqa: F401 - every table must be in the metadata
+
+    pragmas = app.config["SQLITE_PRAGMAS"]
+    app.extensions["sqlite_writer"] = WriterQueue(timeout=pragmas["busy_timeout"] / 1000.0)
+
+    for table in db.metadata.tables.values():
+        table.dialect_options["sqlite"]["autoincrement"] = True
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, "connect", set_pragmas)
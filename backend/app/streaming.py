@@ -0,0 +1,209 @@
+#!/usr/bin/python3
+"""
+Live market price fan-out for Server-Sent Events subscribers.
+
+One MarketFeed watcher thread runs per process. While anyone is
+subscribed it polls market_data with a single high-water-mark query on
+``id`` per tick and pushes each new row to the bounded queue of every
+subscriber interested in that crop, so the database cost is independent
+of the number of open connections. Ids the mark skips over are re-checked
+for MARKET_FEED_GAP_GRACE seconds, so a row that commits after a higher
+id is still delivered, just out of id order.
+"""
+import json
+import queue
+import threading
+import time
+
+from app import db
+from app.models import MarketData
+from app.polling import HighWaterMark
+
+
+class Subscription:
+    """
+    A single SSE client's view of the feed.
+
+    Attributes:
+        crops (set): Crop types the client wants, or None for all crops.
+        dropped (int): Updates discarded because the client fell behind.
+    """
+
+    def __init__(self, crops, max_queue):
+        self.crops = crops
+        self.dropped = 0
+        self.closed = False
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def wants(self, crop_type):
+        """Return True if the client subscribed to this crop."""
+        return self.crops is None or crop_type in self.crops
+
+    def offer(self, event):
+        """
+        Queue an event without blocking the watcher.
+
+        A slow consumer loses its oldest pending update rather than
+        stalling delivery to everyone else.
+        """
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            self._queue.put_nowait(event)
+
+    def get(self, timeout):
+        """Wait for the next event, returning None on timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class MarketFeed:
+    """
+    Process-wide watcher that turns new MarketData rows into SSE events.
+    """
+
+    def __init__(self, poll_interval=1.0, max_queue=100, batch_size=500, gap_grace=60.0):
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()  # Guards the mark against subscribe()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._mark = HighWaterMark(grace=gap_grace)
+        self._app = None
+
+    def subscribe(self, app, crops=None):
+        """
+        Register a new subscriber, starting the watcher if needed.
+
+        When the feed is idle, the starting mark is read here, before the
+        subscriber is added, so a row committed right after subscribing is
+        above the mark and gets delivered.
+
+        Args:
+            app (Flask): Application whose database the watcher polls.
+            crops (set): Crop types to receive, or None for all.
+
+        Returns:
+            Subscription: Handle to read events from.
+        """
+        subscription = Subscription(crops, self.max_queue)
+        with self._lock:
+            idle = not self._subscribers
+        if idle:
+            high_water = db.session.query(
+                db.func.coalesce(db.func.max(MarketData.id), 0)).scalar()
+        with self._lock:
+            if idle and not self._subscribers:  # Nobody subscribed meanwhile
+                with self._poll_lock:
+                    self._mark.reset(high_water)
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._app = app
+                self.poll_interval = app.config.get(
+                    "MARKET_FEED_POLL_INTERVAL", self.poll_interval)
+                self._mark.grace = app.config.get(
+                    "MARKET_FEED_GAP_GRACE", self._mark.grace)
+                self._thread = threading.Thread(
+                    target=self._run, name="market-feed", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscriber; the watcher idles once none remain."""
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def notify(self):
+        """Wake the watcher early, e.g. right after an ingestion commit."""
+        self._wakeup.set()
+
+    def _run(self):
+        """Watcher loop: one high-water-mark query per tick."""
+        with self._app.app_context():
+            while True:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                if not subscribers:
+                    continue  # The next subscribe() skips idle-time rows
+                try:
+                    self._poll(subscribers)
+                except Exception:  # Keep the watcher alive across DB hiccups
+                    self._app.logger.exception("Market feed poll failed")
+                finally:
+                    db.session.remove()
+
+    def _poll(self, subscribers):
+        """Fetch rows above the high-water mark or in its gaps and fan them out."""
+        with self._poll_lock:
+            rows = (MarketData.query
+                    .filter(self._mark.criterion(MarketData.id))
+                    .order_by(MarketData.id)
+                    .limit(self.batch_size)
+                    .all())
+            self._mark.advance(row.id for row in rows)
+        for row in rows:
+            event = format_event("price", {
+                "id": row.id,
+                "crop_type": row.crop_type,
+                "price": row.price,
+                "source": row.source,
+                "data_timestamp": row.data_timestamp.isoformat()
+                if row.data_timestamp else None,
+            }, event_id=row.id)
+            for subscription in subscribers:
+                if subscription.wants(row.crop_type):
+                    subscription.offer(event)
+        if len(rows) == self.batch_size:
+            self._wakeup.set()  # More rows are waiting; don't sleep
+
+def format_event(name, data, event_id=None):
+    """Encode one Server-Sent Event frame."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {name}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def event_stream(feed, subscription, heartbeat=15.0, max_dropped=500):
+    """
+    Yield SSE frames for a subscription until the client disconnects.
+
+    Sends a comment line every ``heartbeat`` seconds of silence so proxies
+    keep the connection open, and tells a client that has fallen too far
+    behind to resync from the REST API instead of buffering forever.
+    """
+    try:
+        yield "retry: 5000\n\n"
+        last_sent = time.monotonic()
+        while not subscription.closed:
+            event = subscription.get(timeout=heartbeat)
+            if subscription.dropped > max_dropped:
+                yield format_event("resync", {"dropped": subscription.dropped})
+                break
+            if event is not None:
+                yield event
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= heartbeat:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+    finally:
+        feed.unsubscribe(subscription)
+
+
+# Shared by every request handled in this process
+market_feed = MarketFeed()
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+"""
+Benchmark for the nightly disease-risk job.
+
+Seeds a throwaway SQLite database with farmers spread over the weather
+fixture's locations and a mix of crops, then times ``run_disease_risk``
+end to end (user query, scoring, bulk replace) and the in-memory
+``score_users`` step on its own, and fails if the job exceeds its budget.
+
+Usage (from the backend directory):
+    python benchmarks/disease_risk.py --farmers 100000 --budget 2.5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+CROPS = ["Potatoes", "potato", "Tomato", "onions", "maize", "beans", "kale"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--farmers", type=int, default=100000)
+    parser.add_argument("--window", type=int, default=7, help="Days scored")
+    parser.add_argument("--runs", type=int, default=3, help="Timed job runs")
+    parser.add_argument("--budget", type=float, default=2.5,
+                        help="Seconds the best job run may take")
+    parser.add_argument("--db", help="SQLite file (default: a temp file)")
+    return parser.parse_args()
+
+
+def seed(db, locations, farmers):
+    """Bulk-load farmers with random fixture locations and crops."""
+    from app.models import User
+
+    now = datetime.utcnow()
+    for start in range(0, farmers, 10000):
+        db.session.bulk_insert_mappings(User, [{
+            "name": f"Farmer {i}", "email": f"farmer{i}@coop.example",
+            "password_hash": "x", "phone": "0700000000", "age": 40,
+            "location": random.choice(locations), "land_size": 2.5,
+            "crop": random.choice(CROPS), "created_at": now, "updated_at": now,
+        } for i in range(start, min(farmers, start + 10000))])
+    db.session.commit()
+
+
+def main():
+    args = parse_args()
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URI"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app import create_app, db
+    from app.disease import WeatherGrid, run_disease_risk, score_users
+    from app.models import User
+
+    app = create_app()
+    weather_path = app.config["DISEASE_WEATHER_PATH"]
+    weather = WeatherGrid.from_json(weather_path)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seed(db, weather.locations, args.farmers)
+        print(f"Seeded {args.farmers} farmers in "
+              f"{time.perf_counter() - started:.1f}s ({db_path})")
+
+        users = User.query.with_entities(User.id, User.location, User.crop).all()
+        started = time.perf_counter()
+        rows = score_users(weather, users, args.window)
+        scoring = time.perf_counter() - started
+        print(f"score_users: {len(rows)} rows in {scoring:.3f}s")
+
+        timings = []
+        for run in range(args.runs):
+            summary = run_disease_risk(weather_path, args.window)
+            timings.append(summary["seconds"])
+            print(f"run {run + 1}: {summary['scored']} rows in {summary['seconds']:.3f}s "
+                  f"{summary['levels']}")
+
+    best = min(timings)
+    verdict = "OK" if best <= args.budget else "OVER BUDGET"
+    print(f"\nBest job run {best:.3f}s for {args.farmers} farmers, "
+          f"budget {args.budget:.1f}s: {verdict}")
+    return 0 if best <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/python3
+"""
+Query-plan regression check for every API route and maintenance job.
+
+Builds a scratch database from the Alembic migrations, seeds it with a
+cooperative-sized dataset, then drives each route (and the background and
+CLI jobs) while capturing every SQL statement the app issues. Each
+captured SELECT, UPDATE and DELETE is explained (EXPLAIN QUERY PLAN on
+SQLite, EXPLAIN on MySQL), and the run fails if a statement falls back to
+a full table scan or a filesort that is not listed in EXPECTED_PLANS, if
+a route has no scenario here, or if a scenario answers with an error.
+Run it before deploying a change that adds queries or routes;
+tests/test_query_plans.py runs it on a small seed.
+
+Usage (from the backend directory):
+    python benchmarks/query_plans.py
+    python benchmarks/query_plans.py --database-uri mysql+pymysql://user:pw@host/scratch
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+# Plan problems that are intended, keyed by (scenario, problem)
+EXPECTED_PLANS = {
+    ("get_users", "full scan of users"): "lists every user",
+    ("get_predictions", "full scan of predictions"): "lists every prediction",
+    ("add_market_data", "full scan of alert_subscriptions"): "alert index rebuild loads all",
+    ("job:disease-risk", "full scan of users"): "scores every user",
+    ("job:disease-risk", "full scan of disease_risks"): "replaces every stored score",
+}
+
+# Routes covered by a job instead of a request
+COVERED_BY_JOB = {
+    "main_routes.stream_market_data": "job:market-feed",  # Never-ending response
+}
+
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-uri",
+                        help="Empty scratch database (default: a temp SQLite file)")
+    parser.add_argument("--farmers", type=int, default=300)
+    parser.add_argument("--records-per-farmer", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print every statement with its plan")
+    return parser.parse_args()
+
+
+def seed_extras(db, farmers):
+    """Rows the load benchmark's seed doesn't create."""
+    import random
+    from app.disease import run_disease_risk
+    from app.models import AlertSubscription, Prediction, RevokedToken, Tombstone
+    from flask import current_app
+    from sqlite_load import CROPS, MARKETS
+
+    now = datetime.utcnow()
+    db.session.bulk_insert_mappings(Prediction, [{
+        "user_id": user_id, "crop": random.choice(CROPS),
+        "yield_estimate": random.uniform(1, 20), "market_price": random.uniform(20, 120),
+        "prediction_date": now, "created_at": now, "updated_at": now,
+    } for user_id in range(1, farmers + 1) for _ in range(3)])
+    db.session.bulk_insert_mappings(AlertSubscription, [{
+        "user_id": user_id, "crop_type": random.choice(CROPS),
+        "market": random.choice(MARKETS + [None]),
+        "direction": random.choice(["above", "below"]),
+        "threshold": random.uniform(20, 120), "created_at": now, "updated_at": now,
+    } for user_id in range(1, farmers + 1)])
+    db.session.bulk_insert_mappings(Tombstone, [{
+        "user_id": user_id, "resource": "record", "resource_id": 10 ** 6 + user_id,
+        "deleted_at": now - timedelta(days=random.randint(0, 60)),
+        "created_at": now, "updated_at": now,
+    } for user_id in range(1, farmers + 1)])
+    db.session.bulk_insert_mappings(RevokedToken, [{
+        "jti": f"seed-{i}", "user_id": random.randint(1, farmers),
+        "expires_at": now + timedelta(hours=random.randint(-48, 1)),
+        "created_at": now, "updated_at": now,
+    } for i in range(farmers)])
+    db.session.commit()
+    run_disease_risk(current_app.config["DISEASE_WEATHER_PATH"],
+                     current_app.config["DISEASE_RISK_WINDOW_DAYS"])
+
+
+def analyze(db):
+    """Refresh planner statistics so plans match a populated database."""
+    with db.engine.begin() as conn:
+        if db.engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+        else:
+            for table in db.metadata.tables:
+                conn.exec_driver_sql(f"ANALYZE TABLE {table}")
+
+
+def scenarios(farmer):
+    """
+    (scenario, method, path, options) for each route, in run order.
+
+    A scenario must answer 2xx or 3xx unless its options give the
+    expected ``status``.
+    """
+    records = "/api/users/1/records"
+    today = date.today()
+    return [
+        ("get_users", "GET", "/api/users", {}),
+        ("create_user", "POST", "/api/users", {"json": {
+            "name": "Plan Check", "email": "plans@coop.example", "password": "pw",
+            "phone": "0700000000", "age": 30, "location": "nakuru",
+            "land_size": 1.0, "crop": "onion"}}),
+        ("register", "POST", "/api/register", {"json": {
+            "name": "Plan Check 2", "email": "plans2@coop.example", "password": "pw",
+            "phone": "0700000000", "age": 30, "location": "nakuru",
+            "land_size": 1.0, "crop": "potato"}}),
+        ("login", "POST", "/api/login", {"json": {
+            "email": "farmer0@coop.example", "password": "password"}}),
+        ("get_user", "GET", "/api/users/1", {}),
+        ("update_user", "PUT", "/api/users/1", {"json": {"name": "Farmer Zero"}}),
+        ("get_records", "GET", records, {"auth": True}),
+        ("get_records", "GET", records, {"auth": True, "query_string": {
+            "crop": "maize", "order_by": "-profit", "limit": 5}}),
+        ("get_records", "GET", records, {"auth": True, "query_string": {
+            "max_profit": 0, "order_by": "profit"}}),
+        ("get_records", "GET", records, {"auth": True, "query_string": {
+            "from": (today - timedelta(days=90)).isoformat(), "to": today.isoformat(),
+            "order_by": "-created_at"}}),
+        ("create_record", "POST", records, {"auth": True, "json": {
+            "crop": "maize", "planting": 100, "weeding": 50, "harvesting": 70,
+            "storage": 10, "sales": 900}}),
+        ("update_record", "PUT", f"{records}/1", {"auth": True, "json": {"sales": 1200}}),
+        ("delete_record", "DELETE", f"{records}/2", {"auth": True}),
+        ("get_predictions", "GET", "/api/predictions", {}),
+        ("add_prediction", "POST", "/api/predictions", {"json": {
+            "user_id": 1, "crop": "maize", "yield_estimate": 4.0}}),
+        ("add_market_data", "POST", "/api/market-data", {"auth": True, "json": [
+            {"crop_type": "maize", "price": 55.0, "source": "nakuru"},
+            {"crop_type": "onion", "price": 80.0, "source": "nairobi"}]}),
+        ("get_price_percentiles", "GET", "/api/market-data/maize/percentiles",
+         {"query_string": {"price": 50}}),
+        ("get_alerts", "GET", "/api/users/1/alerts", {"auth": True}),
+        ("create_alert", "POST", "/api/users/1/alerts", {"auth": True, "json": {
+            "crop_type": "maize", "direction": "above", "threshold": 90}}),
+        ("delete_alert", "DELETE", "/api/users/1/alerts/1", {"auth": True}),
+        ("get_disease_risk", "GET", "/api/users/1/disease-risk", {"auth": True}),
+        ("batch", "POST", "/api/batch", {"auth": True, "json": {"requests": [
+            {"path": "/api/users/1"}, {"path": records},
+            {"path": "/api/market-data/maize/percentiles"}]}}),
+        ("pull_changes", "GET", "/api/sync", {"auth": True}),
+        ("push_changes", "POST", "/api/sync", {"auth": True, "json": {"changes": [
+            {"op": "create", "client_id": "c1", "data": {"crop": "beans", "sales": 10}}]}}),
+        ("get_price_forecast", "GET", "/api/forecast",
+         {"query_string": {"crop": "maize", "horizon": 7}}),
+        ("admin_profiler", "GET", "/api/admin/profiler", {"status": 404}),  # No token set
+        ("logout", "POST", "/api/logout", {"auth": True}),
+    ]
+
+
+def run_jobs(app, run):
+    """Exercise the background watcher and CLI maintenance paths."""
+    from app.disease import run_disease_risk
+    from app.revocation import prune_revoked_tokens
+    from app.services import prune_tombstones, rebuild_price_sketches
+    from app.streaming import MarketFeed
+
+    feed = MarketFeed()
+    with app.app_context():
+        feed._mark.reset(0)  # What subscribe() does on an empty table
+        run("job:market-feed", lambda: (feed._poll([]), feed._poll([])))
+        run("job:rebuild-sketches", rebuild_price_sketches)
+        run("job:prune-tombstones", lambda: prune_tombstones(timedelta(days=30)))
+        run("job:prune-revoked-tokens", prune_revoked_tokens)
+        run("job:disease-risk", lambda: run_disease_risk(
+            app.config["DISEASE_WEATHER_PATH"], app.config["DISEASE_RISK_WINDOW_DAYS"]))
+
+
+def explain(cursor, dialect, statement, parameters, tables):
+    """Return (plan lines, problems) for one captured statement."""
+    problems = []
+    if dialect == "sqlite":
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        lines = [row[-1] for row in cursor.fetchall()]
+        for line in lines:
+            match = SQLITE_SCAN.match(line)
+            if match and match.group(1) in tables:
+                problems.append(f"full scan of {match.group(1)}")
+            if line.startswith("USE TEMP B-TREE"):
+                problems.append("filesort")
+        return lines, problems
+
+    cursor.execute("EXPLAIN " + statement, parameters)
+    columns = [column[0] for column in cursor.description]
+    lines = []
+    for row in cursor.fetchall():
+        row = dict(zip(columns, row))
+        extra = row.get("Extra") or ""
+        lines.append(f"{row['table']}: type={row['type']} key={row['key']} {extra}")
+        if row["type"] in ("ALL", "index") and row["table"] in tables:
+            problems.append(f"full scan of {row['table']}")
+        if "Using filesort" in extra:
+            problems.append("filesort")
+        if "Using temporary" in extra:
+            problems.append("temporary table")
+    return lines, problems
+
+
+def main():
+    args = parse_args()
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    uri = args.database_uri or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "plans.db")
+    os.environ["DATABASE_URI"] = uri
+    os.environ["ADMISSION_ENABLED"] = "false"
+    os.environ["READ_CACHE_BACKEND"] = "none"  # Every request must reach the database
+    sys.path.insert(0, backend)
+
+    from flask_jwt_extended import create_access_token
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+    from app import alerts, create_app, db
+    from app.forecasting import get_price_forecaster
+    from sqlite_load import seed
+
+    app = create_app()
+    with app.app_context():
+        upgrade(directory=os.path.join(backend, "migrations"))
+        seed(app, db, args)
+        seed_extras(db, args.farmers)
+        analyze(db)
+        token = create_access_token(identity=1)
+        engine = db.engine
+    tables = set(db.metadata.tables)
+
+    captured = defaultdict(dict)  # scenario -> {statement: parameters}
+    current = {"scenario": None}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if current["scenario"] and not executemany and verb in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            captured[current["scenario"]].setdefault(statement, parameters)
+
+    def run(scenario, action):
+        current["scenario"] = scenario
+        try:
+            return action()
+        finally:
+            current["scenario"] = None
+
+    # Start the alert matcher cold so its first-tick price lookups are captured
+    alerts._engine = None
+    # Routes answer 503 until the forecaster is warm; warm it like a deploy would
+    with app.app_context():
+        run("job:warm-forecasts", lambda: get_price_forecaster(app).refresh(force=True))
+    client = app.test_client()
+    driven = set()
+    failures = []
+    for scenario, method, path, options in scenarios(1):
+        options = dict(options)
+        if options.pop("auth", False):
+            options["headers"] = {"Authorization": f"Bearer {token}"}
+        expected = options.pop("status", None)
+        response = run(scenario, lambda: client.open(path, method=method, **options))
+        status = response.status_code
+        if (status != expected) if expected else (status >= 400):
+            # An error path skips the queries the scenario is meant to check
+            failures.append(f"{scenario}: {method} {path} returned {status}")
+        driven.add(f"main_routes.{scenario}")
+    run_jobs(app, run)
+
+    routes = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != "static"}
+    for endpoint in sorted(routes - driven - set(COVERED_BY_JOB)):
+        failures.append(f"{endpoint}: no scenario in benchmarks/query_plans.py")
+
+    raw = engine.raw_connection()
+    cursor = raw.cursor()
+    statements = 0
+    try:
+        for scenario, queries in captured.items():
+            for statement, parameters in queries.items():
+                statements += 1
+                lines, problems = explain(cursor, engine.dialect.name, statement,
+                                          parameters, tables)
+                unexpected = [problem for problem in dict.fromkeys(problems)
+                              if (scenario, problem) not in EXPECTED_PLANS]
+                for problem in unexpected:
+                    failures.append(f"{scenario}: {problem}\n    {' '.join(statement.split())}")
+                if args.verbose:
+                    print(f"[{scenario}] {' '.join(statement.split())}")
+                    for line in lines:
+                        print(f"    {line}")
+    finally:
+        cursor.close()
+        raw.close()
+
+    print(f"Explained {statements} statements from {len(captured)} scenarios "
+          f"on {engine.dialect.name}.")
+    if failures:
+        print(f"\n{len(failures)} problems:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("No unexpected full scans or filesorts.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+"""
+Load benchmark for the SQLite edge deployment mode.
+
+Seeds a throwaway SQLite database with a cooperative-sized dataset, then
+drives a market-day request mix through the app from concurrent client
+threads pinned to a single CPU core, and reports throughput and latency
+percentiles per endpoint.
+
+Usage (from the backend directory):
+    python benchmarks/sqlite_load.py --farmers 500 --requests 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+CROPS = ["maize", "onion", "beans", "potato", "tomato", "kale", "sorghum"]
+MARKETS = ["nairobi", "nakuru", "eldoret", "kisumu", "mombasa"]
+
+# (name, weight) of each request type in the market-day mix
+MIX = [
+    ("get_records", 30),
+    ("get_user", 10),
+    ("create_record", 15),
+    ("update_record", 5),
+    ("percentiles", 15),
+    ("sync", 10),
+    ("batch", 5),
+    ("ingest_tick", 9),
+    ("login", 1),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--farmers", type=int, default=500)
+    parser.add_argument("--records-per-farmer", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=16,
+                        help="Concurrent client threads")
+    parser.add_argument("--target-rps", type=float, default=50.0,
+                        help="Peak load the box must sustain")
+    parser.add_argument("--db", help="SQLite file (default: a temp file)")
+    return parser.parse_args()
+
+
+def record_row(user_id, now):
+    """A random Record mapping; bulk inserts skip the ORM's profit hook."""
+    costs = {"planting": random.uniform(500, 5000), "weeding": random.uniform(200, 2000),
+             "harvesting": random.uniform(300, 3000), "storage": random.uniform(0, 1000)}
+    sales = random.uniform(0, 20000)
+    total_cost = sum(costs.values())
+    return dict(costs, user_id=user_id, crop=random.choice(CROPS), sales=sales,
+                total_cost=total_cost, profit=sales - total_cost,
+                created_at=now - timedelta(days=random.randint(0, 365)), updated_at=now)
+
+
+def seed(app, db, args):
+    """Bulk-load farmers, their records and market price history."""
+    from werkzeug.security import generate_password_hash
+    from app.models import Record, User
+    from app.services import ingest_market_data
+
+    password_hash = generate_password_hash("password")
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(User, [{
+            "name": f"Farmer {i}", "email": f"farmer{i}@coop.example",
+            "password_hash": password_hash, "phone": "0700000000", "age": 40,
+            "location": random.choice(MARKETS), "land_size": 2.5,
+            "crop": random.choice(CROPS), "created_at": now, "updated_at": now,
+        } for i in range(args.farmers)])
+        db.session.bulk_insert_mappings(Record, [
+            record_row(user_id, now) for user_id in range(1, args.farmers + 1)
+            for _ in range(args.records_per_farmer)])
+        db.session.commit()
+
+        for start in range(0, args.ticks, 5000):
+            ingest_market_data([{
+                "crop_type": random.choice(CROPS),
+                "price": random.uniform(20, 120),
+                "source": random.choice(MARKETS),
+                "data_timestamp": now - timedelta(minutes=random.randint(0, 90 * 24 * 60)),
+            } for _ in range(min(5000, args.ticks - start))])
+
+
+def make_request(client, kind, farmer, token, records_per_farmer):
+    """Issue one request of the given kind; return the status code."""
+    headers = {"Authorization": f"Bearer {token}"}
+    records_url = f"/api/users/{farmer}/records"
+    if kind == "get_records":
+        return client.get(records_url, headers=headers).status_code
+    if kind == "get_user":
+        return client.get(f"/api/users/{farmer}").status_code
+    if kind == "create_record":
+        return client.post(records_url, headers=headers, json={
+            "crop": random.choice(CROPS), "planting": 1000, "weeding": 500,
+            "harvesting": 700, "storage": 100, "sales": random.uniform(0, 5000),
+        }).status_code
+    if kind == "update_record":
+        record_id = (farmer - 1) * records_per_farmer + random.randint(1, records_per_farmer)
+        return client.put(f"{records_url}/{record_id}", headers=headers,
+                          json={"sales": random.uniform(0, 5000)}).status_code
+    if kind == "percentiles":
+        crop = random.choice(CROPS)
+        return client.get(f"/api/market-data/{crop}/percentiles",
+                          query_string={"price": random.uniform(20, 120)}).status_code
+    if kind == "sync":
+        return client.get("/api/sync", headers=headers).status_code
+    if kind == "batch":
+        return client.post("/api/batch", headers=headers, json={"requests": [
+            {"path": f"/api/users/{farmer}"},
+            {"path": records_url},
+            {"path": f"/api/market-data/{random.choice(CROPS)}/percentiles"},
+        ]}).status_code
+    if kind == "ingest_tick":
+        return client.post("/api/market-data", headers=headers, json={
+            "crop_type": random.choice(CROPS), "price": random.uniform(20, 120),
+            "source": random.choice(MARKETS),
+        }).status_code
+    if kind == "login":
+        return client.post("/api/login", json={
+            "email": f"farmer{farmer - 1}@coop.example", "password": "password",
+        }).status_code
+    raise ValueError(kind)
+
+
+def main():
+    args = parse_args()
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URI"] = f"sqlite:///{db_path}"
+    os.environ["ADMISSION_ENABLED"] = "false"  # Measure capacity, not shedding
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {sorted(os.sched_getaffinity(0))[0]})
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+
+    app = create_app()
+    started = time.perf_counter()
+    seed(app, db, args)
+    print(f"Seeded {args.farmers} farmers, "
+          f"{args.farmers * args.records_per_farmer} records, {args.ticks} ticks "
+          f"in {time.perf_counter() - started:.1f}s ({db_path})")
+
+    with app.app_context():
+        tokens = {farmer: create_access_token(identity=farmer)
+                  for farmer in range(1, args.farmers + 1)}
+
+    kinds = [kind for kind, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    plan = [(random.choices(kinds, weights)[0], random.randint(1, args.farmers))
+            for _ in range(args.requests)]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    local = threading.local()
+
+    def run(step):
+        kind, farmer = step
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        began = time.perf_counter()
+        status = make_request(local.client, kind, farmer, tokens[farmer],
+                              args.records_per_farmer)
+        latencies[kind].append((time.perf_counter() - began) * 1000)
+        if status >= 400:
+            errors[kind] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(run, plan))
+    elapsed = time.perf_counter() - started
+
+    throughput = args.requests / elapsed
+    print(f"\n{args.requests} requests from {args.clients} clients on one core "
+          f"in {elapsed:.1f}s: {throughput:.1f} req/s\n")
+    print(f"{'endpoint':<15}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for kind in kinds:
+        samples = sorted(latencies[kind])
+        if not samples:
+            continue
+        cuts = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+        print(f"{kind:<15}{len(samples):>7}{errors[kind]:>8}"
+              f"{cuts[49]:>9.1f}{cuts[94]:>9.1f}{cuts[98]:>9.1f}")
+
+    verdict = "OK" if throughput >= args.target_rps else "BELOW TARGET"
+    print(f"\nTarget {args.target_rps:.0f} req/s: {verdict}")
+    return 0 if throughput >= args.target_rps else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Store record total cost and profit for filtering and sorting
+
+Revision ID: 5f0c8b3e7a14
+Revises: c41a7e0b9d23
+Create Date: 2026-10-18 19:08:33.270541
+
+The columns are added with a constant server default, which MySQL 8
+applies in place without rebuilding the table. Existing rows are then
+backfilled in primary-key chunks, each committed on its own, so no
+statement holds row locks on more than BACKFILL_CHUNK records at a time.
+The indexes are built with online DDL on MySQL.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c8b3e7a14'
+down_revision = 'c41a7e0b9d23'
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 5000
+
+records = sa.table(
+    'records',
+    sa.column('id', sa.Integer),
+    sa.column('planting', sa.Float),
+    sa.column('weeding', sa.Float),
+    sa.column('harvesting', sa.Float),
+    sa.column('storage', sa.Float),
+    sa.column('sales', sa.Float),
+    sa.column('total_cost', sa.Float),
+    sa.column('profit', sa.Float),
+)
+
+
+def backfill():
+    """Compute total_cost and profit for existing rows, one chunk per commit."""
+    conn = op.get_bind()
+    total_cost = records.c.planting + records.c.weeding + records.c.harvesting + records.c.storage
+    last_id = 0
+    while True:
+        # Upper id of the next chunk, or of the final partial chunk
+        bound = conn.execute(
+            sa.select(records.c.id)
+            .where(records.c.id > last_id)
+            .order_by(records.c.id)
+            .limit(1)
+            .offset(BACKFILL_CHUNK - 1)
+        ).scalar()
+        if bound is None:
+            bound = conn.execute(
+                sa.select(sa.func.max(records.c.id)).where(records.c.id > last_id)
+            ).scalar()
+            if bound is None:
+                break
+        conn.execute(
+            records.update()
+            .where(records.c.id > last_id, records.c.id <= bound)
+            .values(total_cost=total_cost, profit=records.c.sales - total_cost)
+        )
+        last_id = bound
+
+
+def upgrade():
+    op.add_column('records', sa.Column('total_cost', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('records', sa.Column('profit', sa.Float(), nullable=False, server_default='0'))
+
+    # Each chunk commits on its own instead of one long table-wide UPDATE
+    with op.get_context().autocommit_block():
+        backfill()
+
+    op.create_index('ix_records_user_created', 'records', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_records_user_profit', 'records', ['user_id', 'profit'], unique=False)
+    op.create_index('ix_records_user_crop_profit', 'records', ['user_id', 'crop', 'profit'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_records_user_crop_profit', table_name='records')
+    op.drop_index('ix_records_user_profit', table_name='records')
+    op.drop_index('ix_records_user_created', table_name='records')
+    with op.batch_alter_table('records') as batch_op:
+        batch_op.drop_column('profit')
+        batch_op.drop_column('total_cost')
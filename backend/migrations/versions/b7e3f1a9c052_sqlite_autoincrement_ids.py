@@ -0,0 +1,58 @@
+"""Declare SQLite tables AUTOINCREMENT so ids are never reused
+
+Revision ID: b7e3f1a9c052
+Revises: 9a6d2c4b8e17
+Create Date: 2026-10-18 23:41:06.218437
+
+Without AUTOINCREMENT, SQLite gives a new row the id of the deleted row
+with the highest id, so a tombstone and a live record can share an id
+and the id high-water marks in revocation.py and streaming.py can skip
+rows. SQLite can't change this in place, so each table is rebuilt by a
+batch migration; MySQL already never reuses ids and is left alone.
+The records sequence starts past every tombstoned record id, so ids
+deleted before this migration aren't handed out again either.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f1a9c052'
+down_revision = '9a6d2c4b8e17'
+branch_labels = None
+depends_on = None
+
+TABLES = ['users', 'records', 'predictions', 'market_data', 'price_sketches',
+          'tombstones', 'alert_subscriptions', 'disease_risks', 'revoked_tokens']
+
+
+def rebuild_tables(autoincrement):
+    context = op.get_context()
+    if context.dialect.name != 'sqlite':
+        return
+    # Dropping a parent table with foreign keys on would cascade or fail;
+    # the pragma only takes effect outside a transaction
+    with context.autocommit_block():
+        op.execute('PRAGMA foreign_keys=OFF')
+    try:
+        for table in TABLES:
+            with op.batch_alter_table(table, recreate='always',
+                                      table_kwargs={'sqlite_autoincrement': autoincrement}):
+                pass
+    finally:
+        with context.autocommit_block():
+            op.execute('PRAGMA foreign_keys=ON')
+
+
+def upgrade():
+    rebuild_tables(True)
+    if op.get_context().dialect.name == 'sqlite':
+        op.execute("DELETE FROM sqlite_sequence WHERE name = 'records'")
+        op.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'records', max("
+            "(SELECT coalesce(max(id), 0) FROM records), "
+            "(SELECT coalesce(max(resource_id), 0) FROM tombstones WHERE resource = 'record'))")
+
+
+def downgrade():
+    rebuild_tables(False)
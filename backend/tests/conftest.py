@@ -0,0 +1,10 @@
+#!/usr/bin/python3
+"""
+Shared pytest setup: makes the ``app`` package importable when pytest is
+run from the backend directory.
+"""
+import os
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+"""
+Tests for alert threshold matching.
+"""
+from app.alerts import ABOVE, BELOW, AlertMatcher, ThresholdIndex
+
+
+def subscription(sub_id, direction, threshold, market="nakuru", crop_type="maize"):
+    return {"id": sub_id, "user_id": sub_id, "crop_type": crop_type,
+            "market": market, "direction": direction, "threshold": threshold}
+
+
+def ids(subscriptions):
+    return sorted(sub["id"] for sub in subscriptions)
+
+
+# ThresholdIndex
+
+def make_index():
+    index = ThresholdIndex()
+    for sub_id, threshold in [(1, 10), (2, 20), (3, 20), (4, 30)]:
+        index.add(threshold, sub_id)
+    return index
+
+
+def test_between_inclusive_high():
+    index = make_index()
+    assert sorted(index.between(10, 20, inclusive_high=True)) == [2, 3]
+    assert index.between(20, 30, inclusive_high=True) == [4]
+    assert index.between(30, 40, inclusive_high=True) == []
+
+
+def test_between_inclusive_low():
+    index = make_index()
+    assert index.between(10, 20, inclusive_high=False) == [1]
+    assert sorted(index.between(20, 30, inclusive_high=False)) == [2, 3]
+    assert index.between(0, 10, inclusive_high=False) == []
+
+
+def test_remove_only_drops_that_subscription():
+    index = make_index()
+    index.remove(20, 2)
+    index.remove(20, 99)  # Unknown id is ignored
+    assert len(index) == 3
+    assert index.between(10, 20, inclusive_high=True) == [3]
+
+
+# AlertMatcher
+
+def make_matcher():
+    matcher = AlertMatcher()
+    matcher.add(subscription(1, ABOVE, 100))
+    matcher.add(subscription(2, BELOW, 100))
+    matcher.add(subscription(3, ABOVE, 150, market=None))  # Any market
+    matcher.add(subscription(4, ABOVE, 120, crop_type="beans"))
+    return matcher
+
+
+def test_rise_fires_above_thresholds_up_to_and_including_price():
+    matcher = make_matcher()
+    assert ids(matcher.match("maize", "nakuru", 90, 100)) == [1]
+    assert ids(matcher.match("maize", "nakuru", 100, 150)) == [3]
+    assert ids(matcher.match("maize", "nakuru", 90, 200)) == [1, 3]
+
+
+def test_fall_fires_below_thresholds_down_to_and_including_price():
+    matcher = make_matcher()
+    assert ids(matcher.match("maize", "nakuru", 110, 100)) == [2]
+    assert ids(matcher.match("maize", "nakuru", 100, 90)) == []  # Already below
+    assert ids(matcher.match("maize", "nakuru", 150, 80)) == [2]
+
+
+def test_no_previous_or_unchanged_price_fires_nothing():
+    matcher = make_matcher()
+    assert matcher.match("maize", "nakuru", None, 200) == []
+    assert matcher.match("maize", "nakuru", 100, 100) == []
+
+
+def test_market_scoping():
+    matcher = make_matcher()
+    # Other markets only reach the any-market subscription
+    assert ids(matcher.match("maize", "eldoret", 90, 200)) == [3]
+    # A tick without a market is matched once against the any-market key
+    assert ids(matcher.match("maize", None, 90, 200)) == [3]
+    assert ids(matcher.match("beans", "nakuru", 100, 130)) == [4]
+
+
+def test_removed_subscription_stops_matching():
+    matcher = make_matcher()
+    matcher.remove(1)
+    matcher.remove(1)  # Twice is harmless
+    assert ids(matcher.match("maize", "nakuru", 90, 200)) == [3]
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""
+Tests for the per-request JWT decode cache.
+
+CachingJWTManager overrides a private flask_jwt_extended hook, so these
+tests also pin down that every decode still goes through it.
+"""
+import inspect
+
+import pytest
+from flask import Flask, request
+from flask_jwt_extended import (JWTManager, create_access_token, decode_token,
+                                verify_jwt_in_request)
+
+from app.admission import SUBREQUEST_KEY
+from app.auth import (DECODED_JWT_KEY, CachingJWTManager, VerifiedToken,
+                      forget_verified_token, verified_by_batch)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret"
+    CachingJWTManager(app)
+    return app
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Count the signature checks that reach the library."""
+    calls = []
+    original = JWTManager._decode_jwt_from_config
+
+    def counting(self, *args, **kwargs):
+        calls.append(args[0])
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(JWTManager, "_decode_jwt_from_config", counting)
+    return calls
+
+
+def token(app, identity="1"):
+    with app.app_context():
+        return create_access_token(identity=identity)
+
+
+def bearer(encoded):
+    return {"Authorization": f"Bearer {encoded}"}
+
+
+def test_library_hook_still_exists():
+    parameters = list(inspect.signature(JWTManager._decode_jwt_from_config).parameters)
+    assert parameters == ["self", "encoded_token", "csrf_value", "allow_expired"]
+    # The public decode path must call the hook we override
+    assert "_decode_jwt_from_config" in inspect.getsource(decode_token)
+
+
+def test_token_is_decoded_once_per_request(app, decodes):
+    encoded = token(app)
+    with app.test_request_context(headers=bearer(encoded)):
+        verify_jwt_in_request()
+        verify_jwt_in_request()
+        assert decode_token(encoded)["sub"] == "1"
+    assert decodes == [encoded]
+
+
+def test_other_token_is_not_answered_from_cache(app, decodes):
+    first, second = token(app, "1"), token(app, "2")
+    with app.test_request_context(headers=bearer(first)):
+        verify_jwt_in_request()
+        assert decode_token(second)["sub"] == "2"
+    assert decodes == [first, second]
+
+
+def test_sub_request_trusts_batch_token_until_revoked(app, decodes):
+    encoded = token(app)
+    with app.app_context():
+        claims = decode_token(encoded)
+    shared = VerifiedToken(encoded, claims)
+    environ = {SUBREQUEST_KEY: True, DECODED_JWT_KEY: shared}
+    decodes.clear()
+
+    with app.test_request_context(headers=bearer(encoded), environ_base=environ):
+        verify_jwt_in_request()
+        assert verified_by_batch(claims)
+        forget_verified_token(claims["jti"])
+        assert not verified_by_batch(claims)
+
+    # A later sub-request of the same batch decodes and checks it afresh
+    with app.test_request_context(headers=bearer(encoded), environ_base=environ):
+        verify_jwt_in_request()
+        assert not verified_by_batch(claims)
+        assert environ[DECODED_JWT_KEY] is shared
+    assert decodes == [encoded]
+
+
+def test_sub_request_does_not_cache_its_own_decode(app):
+    encoded = token(app)
+    with app.test_request_context(headers=bearer(encoded),
+                                  environ_base={SUBREQUEST_KEY: True}):
+        verify_jwt_in_request()
+        assert DECODED_JWT_KEY not in request.environ
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""
+Tests for the in-process read cache backend.
+"""
+import pytest
+
+from app import cache
+from app.cache import MemoryBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable stand-in for time.monotonic."""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def store(backend, owner, key, payload):
+    backend.set(owner, key, payload, backend.generation(owner))
+
+
+def test_entries_expire_after_ttl(clock):
+    backend = MemoryBackend(max_bytes=1024, ttl=30.0)
+    store(backend, 1, "1:records:", b"[]")
+    clock[0] += 29.0
+    assert backend.get("1:records:") == b"[]"
+    clock[0] += 1.0
+    assert backend.get("1:records:") is None
+    assert backend._size == 0
+
+
+def test_invalidate_drops_owner_entries(clock):
+    backend = MemoryBackend(max_bytes=1024)
+    store(backend, 1, "1:records:", b"[1]")
+    store(backend, 2, "2:records:", b"[2]")
+    backend.invalidate([1])
+    assert backend.get("1:records:") is None
+    assert backend.get("2:records:") == b"[2]"
+
+
+def test_payload_built_before_invalidation_is_not_stored(clock):
+    backend = MemoryBackend(max_bytes=1024)
+    generation = backend.generation(1)
+    backend.invalidate([1])
+    backend.set(1, "1:records:", b"stale", generation)
+    assert backend.get("1:records:") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    backend = MemoryBackend(max_bytes=8)
+    store(backend, 1, "a", b"1234")
+    store(backend, 1, "b", b"5678")
+    backend.get("a")
+    store(backend, 1, "c", b"9012")
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1234"
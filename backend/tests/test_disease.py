@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+"""
+Tests for the disease risk models, weather loading and user scoring.
+
+The hand-built grids hold a few locations over a few days with weather
+picked to sit just inside or just outside each rule, so the expected
+Hutton and DOWNCAST outcomes can be read off the arrays.
+"""
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.disease import (WeatherGrid, late_blight, onion_downy_mildew,
+                         score_users)
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "fixtures", "weather.json")
+
+
+def grid(locations, days, temperature=15.0, humidity=60.0):
+    """Uniform (locations, days, 24) temperature and humidity arrays."""
+    shape = (locations, days, 24)
+    return np.full(shape, temperature), np.full(shape, humidity)
+
+
+# Late blight (Hutton criteria)
+
+def test_late_blight_consecutive_humid_days_are_high_risk():
+    temperature, humidity = grid(1, 3, temperature=12, humidity=95)
+    score, events, level = late_blight(temperature, humidity)
+    assert score.tolist() == [1.0]
+    assert events.tolist() == [2]
+    assert level.tolist() == [2]
+
+
+def test_late_blight_isolated_humid_day_is_moderate():
+    temperature, humidity = grid(1, 4, temperature=12)
+    humidity[0, 2, :6] = 90  # Exactly the 6 humid hours needed
+    score, events, level = late_blight(temperature, humidity)
+    assert score.tolist() == [pytest.approx(1 / 3)]
+    assert events.tolist() == [0]
+    assert level.tolist() == [1]
+
+
+def test_late_blight_thresholds():
+    temperature, humidity = grid(3, 2, temperature=12, humidity=95)
+    humidity[0, :, 5:] = 80  # Only 5 humid hours a day
+    temperature[1, :, 3] = 9.9  # Night dips below 10°C
+    humidity[2, :, 6:] = 89  # 6 humid hours; 89% doesn't count
+    score, events, level = late_blight(temperature, humidity)
+    assert score.tolist() == [0.0, 0.0, 1.0]
+    assert events.tolist() == [0, 0, 1]
+    assert level.tolist() == [0, 0, 2]
+
+
+def test_late_blight_lead_in_day_counts_for_periods_only():
+    temperature, humidity = grid(1, 3, temperature=12)
+    humidity[0, 0:2] = 95  # Lead-in day and the first scored day
+    score, events, level = late_blight(temperature, humidity)
+    assert score.tolist() == [0.5]
+    assert events.tolist() == [1]
+    assert level.tolist() == [2]
+
+
+# Onion downy mildew (DOWNCAST)
+
+def test_downcast_counts_sporulation_nights():
+    temperature, humidity = grid(1, 4)
+    humidity[0, 1:, 0:4] = 96  # 4 favourable hours on each scored night
+    score, events, level = onion_downy_mildew(temperature, humidity)
+    assert score.tolist() == [1.0]
+    assert events.tolist() == [3]
+    assert level.tolist() == [2]
+
+
+def test_downcast_single_night_is_moderate():
+    temperature, humidity = grid(1, 3)
+    humidity[0, 2, 3:7] = 95  # Hours 03:00-06:00
+    score, events, level = onion_downy_mildew(temperature, humidity)
+    assert score.tolist() == [0.5]
+    assert events.tolist() == [1]
+    assert level.tolist() == [1]
+
+
+def test_downcast_thresholds():
+    temperature, humidity = grid(5, 2)
+    humidity[:, 1, 0:4] = 96
+    humidity[0, 1, 3] = 94  # Only 3 favourable hours
+    temperature[1, 0, 14] = 24  # Warm day before the night
+    temperature[2, 1, 0:4] = 3.9  # Too cold to sporulate
+    temperature[3, 1, 0:4] = 24.5  # Too warm to sporulate
+    humidity[4, 1] = 60
+    humidity[4, 1, 7:11] = 96  # Humid, but after 07:00
+    score, events, level = onion_downy_mildew(temperature, humidity)
+    assert events.tolist() == [0, 0, 0, 0, 0]
+    assert level.tolist() == [0, 0, 0, 0, 0]
+
+
+# Weather loading
+
+def test_from_json_fixture():
+    weather = WeatherGrid.from_json(FIXTURE)
+    assert weather.locations == ["Eldoret", "Kisumu", "Mombasa", "Nairobi", "Nakuru"]
+    assert weather.first_day == date(2026, 10, 1)
+    assert weather.last_day == date(2026, 10, 14)
+    assert weather.temperature.shape == weather.humidity.shape == (5, 14, 24)
+
+
+def test_from_json_drops_partial_days(tmp_path):
+    hours = 6 + 48 + 5  # Evening of day 0, two whole days, morning of day 3
+    path = tmp_path / "weather.json"
+    path.write_text(json.dumps({
+        "start": "2026-10-01T18:00:00",
+        "interval_hours": 1,
+        "locations": {
+            "b": {"temperature": list(range(hours)), "humidity": [50] * hours},
+            "a": {"temperature": [0] * hours, "humidity": [70] * hours},
+        },
+    }))
+    weather = WeatherGrid.from_json(path)
+    assert weather.locations == ["a", "b"]
+    assert weather.first_day == date(2026, 10, 2)
+    assert weather.days == 2
+    assert weather.temperature[1, 0, 0] == 6  # First midnight
+    assert weather.temperature[1, 1, 23] == 53  # Last complete hour
+    assert (weather.humidity[0] == 70).all()
+
+
+def test_fixture_outcomes():
+    temperature, humidity = WeatherGrid.from_json(FIXTURE).window(8)
+
+    score, events, level = late_blight(temperature, humidity)
+    assert score.tolist() == pytest.approx([0, 4 / 7, 3 / 7, 3 / 7, 0])
+    assert events.tolist() == [0, 1, 0, 0, 0]
+    assert level.tolist() == [0, 2, 1, 1, 0]
+
+    score, events, level = onion_downy_mildew(temperature, humidity)
+    assert score.tolist() == pytest.approx([3 / 7, 0, 0, 0, 3 / 7])
+    assert events.tolist() == [3, 0, 0, 0, 3]
+    assert level.tolist() == [2, 0, 0, 0, 2]
+
+
+# User scoring
+
+def test_score_users_maps_users_to_location_results():
+    weather = WeatherGrid.from_json(FIXTURE)
+    users = [
+        (1, "Kisumu", "Potatoes"),
+        (2, " nakuru ", "onions"),
+        (3, "Eldoret", "Tomato"),
+        (4, "Kisumu", "maize"),  # No disease model
+        (5, "Kampala", "potato"),  # No weather
+        (6, None, None),
+    ]
+    rows = {(row["user_id"], row["disease"]): row
+            for row in score_users(weather, users, window_days=7)}
+
+    assert sorted(rows) == [(1, "late_blight"), (2, "onion_downy_mildew"),
+                            (3, "late_blight")]
+    kisumu = rows[(1, "late_blight")]
+    assert (kisumu["crop"], kisumu["level"], kisumu["events"]) == ("potato", "high", 1)
+    assert kisumu["score"] == round(4 / 7, 4)
+    assert kisumu["window_end"] == date(2026, 10, 14)
+    nakuru = rows[(2, "onion_downy_mildew")]
+    assert (nakuru["crop"], nakuru["level"], nakuru["events"]) == ("onion", "high", 3)
+    eldoret = rows[(3, "late_blight")]
+    assert (eldoret["crop"], eldoret["level"], eldoret["score"]) == ("tomato", "low", 0.0)
+
+
+def test_score_users_needs_two_days():
+    temperature, humidity = grid(1, 1)
+    weather = WeatherGrid(["Nairobi"], date(2026, 10, 1), temperature, humidity)
+    with pytest.raises(ValueError):
+        score_users(weather, [(1, "Nairobi", "potato")], window_days=7)
+    with pytest.raises(ValueError):
+        score_users(WeatherGrid.from_json(FIXTURE), [], window_days=0)
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""
+Tests for the gap-tolerant id high-water mark.
+"""
+from app.polling import HighWaterMark
+
+
+def test_skipped_ids_become_gaps_until_seen():
+    mark = HighWaterMark()
+    mark.reset(3)
+    mark.advance([5, 7])
+    assert mark.value == 7
+    assert mark.gaps == [4, 6]
+    mark.advance([4])  # Committed late
+    assert mark.value == 7
+    assert mark.gaps == [6]
+
+
+def test_gaps_expire_after_grace():
+    mark = HighWaterMark(grace=0)
+    mark.reset(0)
+    mark.advance([2])
+    assert mark.gaps == [1]
+    mark.advance([])
+    assert mark.gaps == []
+    assert mark.value == 2
+
+
+def test_gap_count_is_bounded():
+    mark = HighWaterMark(max_gaps=3)
+    mark.reset(0)
+    mark.advance([100])
+    assert mark.gaps == [97, 98, 99]
+    mark.advance([102])
+    assert mark.gaps == [98, 99, 101]  # Oldest gap dropped
+
+
+def test_criterion_includes_gaps():
+    from app.models import MarketData
+
+    mark = HighWaterMark()
+    mark.reset(10)
+    assert str(mark.criterion(MarketData.id)) == "market_data.id > :id_1"
+    mark.advance([12])
+    sql = str(mark.criterion(MarketData.id).compile(
+        compile_kwargs={"literal_binds": True}))
+    assert sql == "market_data.id > 12 OR market_data.id IN (11)"
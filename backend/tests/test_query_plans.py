@@ -0,0 +1,22 @@
+#!/usr/bin/python3
+"""
+Runs the query-plan regression check on a small seed.
+
+The check configures the app from environment variables before importing
+it, so it runs in its own interpreter rather than alongside the app
+already imported by the other tests.
+"""
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_query_plans_pass_on_small_seed():
+    script = os.path.join(BACKEND, "benchmarks", "query_plans.py")
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", script,
+         "--farmers", "20", "--records-per-farmer", "5", "--ticks", "500"],
+        cwd=BACKEND, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout[-4000:] + result.stderr[-4000:]
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""
+Tests for the mergeable quantile sketch behind the price percentiles.
+"""
+import random
+
+import pytest
+
+from app.sketches import QuantileSketch
+
+
+def filled(values, compression=100.0):
+    sketch = QuantileSketch(compression)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.fixture
+def prices():
+    rng = random.Random(7)
+    return [rng.lognormvariate(4, 0.5) for _ in range(20000)]
+
+
+def exact_quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def test_empty_sketch():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.rank(10) is None
+
+
+def test_small_sketch_is_exact():
+    sketch = filled([10, 20, 30, 40])
+    assert sketch.count == 4
+    assert (sketch.min, sketch.max) == (10, 40)
+    assert sketch.quantile(0) == 10
+    assert sketch.quantile(1) == 40
+    assert sketch.rank(5) == 0.0
+    assert sketch.rank(40) == 1.0
+    assert sketch.quantile(0.5) == pytest.approx(25)
+
+
+def test_quantile_and_rank_accuracy(prices):
+    sketch = filled(prices)
+    ordered = sorted(prices)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        estimate = sketch.quantile(q)
+        # Judge the estimate by where it falls in the true distribution
+        true_rank = sum(price <= estimate for price in ordered) / len(ordered)
+        assert true_rank == pytest.approx(q, abs=0.01)
+        assert sketch.rank(exact_quantile(ordered, q)) == pytest.approx(q, abs=0.01)
+
+
+def test_sketch_stays_small(prices):
+    small = filled(prices[:2000])
+    large = filled(prices * 5)
+    small.quantile(0.5)  # Flushes the buffers
+    large.quantile(0.5)
+    assert len(large._means) < 10 * large.compression
+    # Grows with the log of the input, not the input
+    assert len(large._means) < 2 * len(small._means)
+
+
+def test_merge_matches_single_sketch(prices):
+    halves = filled(prices[:10000]).merge(filled(prices[10000:]))
+    whole = filled(prices)
+    assert halves.count == whole.count == len(prices)
+    assert (halves.min, halves.max) == (min(prices), max(prices))
+    for q in (0.1, 0.5, 0.9):
+        assert halves.quantile(q) == pytest.approx(whole.quantile(q), rel=0.02)
+
+
+def test_merge_into_empty_sketch():
+    merged = QuantileSketch().merge(filled([1, 2, 3]))
+    assert merged.count == 3
+    assert (merged.min, merged.max) == (1, 3)
+    assert merged.quantile(0.5) == pytest.approx(2)
+
+
+def test_bytes_round_trip(prices):
+    sketch = filled(prices, compression=50)
+    restored = QuantileSketch.from_bytes(sketch.to_bytes())
+    assert restored.compression == 50
+    assert restored.count == sketch.count
+    assert (restored.min, restored.max) == (sketch.min, sketch.max)
+    for q in (0.05, 0.5, 0.95):
+        assert restored.quantile(q) == sketch.quantile(q)
+    assert restored.rank(60) == sketch.rank(60)
+    restored.add(1000)  # A restored sketch keeps accepting prices
+    assert restored.max == 1000
+    assert restored.count == sketch.count + 1